@@ -0,0 +1,200 @@
+"""Deterministic compose benchmark (no network, no hardware).
+
+Loads recorded weather/Tibber/dishes fixtures from `fixtures/`, freezes the clock
+and times each section, compose (cold and after a device toggle), 1-bit packing,
+the full compose -> pack pipeline and the epd7in5_V2 driver's CPU cost (on the
+virtual epdconfig backend, waveform waits disabled) over N iterations. Reports
+min/median/p95 per stage plus peak Python heap (tracemalloc) and compares medians
+with a stored baseline so layout changes can be checked on a laptop before deploying.
+
+    venv/bin/python benchmark.py                  # run + compare with baseline (if any)
+    venv/bin/python benchmark.py -n 200
+    venv/bin/python benchmark.py --save-baseline  # store current medians as the baseline
+
+Exit code 1 when a stage's median regresses past the baseline by more than
+`--tolerance` (relative) and `--min-delta-ms` (absolute, filters timer noise).
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+# Fixture timestamps are local Stockholm time; pin the zone before anything formats times
+os.environ["TZ"] = "Europe/Stockholm"
+time.tzset()
+# Real driver on the emulated panel; measure CPU/transport cost, not waveform time
+os.environ.setdefault("EPD_BACKEND", "virtual")
+os.environ.setdefault("EPD_VIRTUAL_TIME_SCALE", "0")
+
+from PIL import ImageDraw  # noqa: E402
+import compose  # noqa: E402
+import devices  # noqa: E402
+from dither import pack_ordered  # noqa: E402
+from electricity_price import build_electricity_price_data  # noqa: E402
+from providers import PROVIDERS  # noqa: E402
+from weather_api import build_weather_display_data, digest_weather_data  # noqa: E402
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BASE_DIR, "fixtures")
+DEFAULT_BASELINE = os.path.join(FIXTURES_DIR, "benchmark_baseline.json")
+
+# Frozen clock matching the fixtures (Monday morning, CET)
+FROZEN_NOW = datetime(2025, 10, 27, 10, 0, tzinfo=timezone(timedelta(hours=1)))
+
+
+def _load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_fixtures():
+    """Publish fixture snapshots into the providers (no network access afterwards)."""
+    weather = digest_weather_data(_load_fixture("weather_onecall.json"))
+    PROVIDERS["weather"].publish(build_weather_display_data(weather, now=FROZEN_NOW.timestamp()))
+    PROVIDERS["electricity"].publish(build_electricity_price_data(_load_fixture("tibber.json"), now=FROZEN_NOW))
+    PROVIDERS["dishes"].publish(_load_fixture("dishes.json"))
+
+
+def _driver():
+    """Return an epd7in5_V2 EPD, or None if the driver can't load here."""
+    try:
+        from lib.waveshare_epd.epd7in5_V2 import EPD
+        return EPD()
+    except Exception as e:  # noqa: BLE001 (no GPIO/SPI backend on this machine)
+        print(f"[BENCH] driver stages skipped: driver unavailable ({e})")
+        return None
+
+
+def build_stages():
+    """Return [(name, callable)] of stages to time."""
+    now = FROZEN_NOW.replace(tzinfo=None)
+    compose.invalidate_tiles()
+    frame = compose.compose_panel(now)
+    static = compose._static_layer()
+
+    stages = []
+    for section in compose.SECTIONS:
+        data = section.data(now)
+        pos = (section.anchor[0] - section.box[0], section.anchor[1] - section.box[1])
+
+        def run_section(section=section, data=data, pos=pos):
+            section.draw(ImageDraw.Draw(static.crop(section.box)), pos, data)
+        stages.append((f"section:{section.label}", run_section))
+
+    def compose_cold():
+        compose.invalidate_tiles()
+        compose.compose_panel(now)
+
+    def compose_toggle():
+        devices.DEVICES[0]["on"] = not devices.DEVICES[0]["on"]
+        compose.compose_panel(now)
+
+    def pipeline():
+        compose.invalidate_tiles()
+        pack_ordered(compose.compose_panel(now), compose.WIDTH, compose.HEIGHT)
+
+    stages += [
+        ("compose:cold", compose_cold),
+        ("compose:device_toggle", compose_toggle),
+        ("pack:ordered", lambda: pack_ordered(frame, compose.WIDTH, compose.HEIGHT)),
+    ]
+    epd = _driver()
+    if epd is not None:
+        buf = pack_ordered(frame, compose.WIDTH, compose.HEIGHT)
+        gray = epd.getbuffer_4Gray(frame)
+        window = bytes(10 * 40)
+        epd.init()
+        stages += [
+            ("pack:getbuffer", lambda: epd.getbuffer(frame)),
+            ("pack:getbuffer_4Gray", lambda: epd.getbuffer_4Gray(frame)),
+            ("epd:display", lambda: epd.display(buf)),
+            ("epd:display_Partial", lambda: epd.display_Partial(window, 80, 40, 160, 80)),
+            ("epd:display_4Gray", lambda: epd.display_4Gray(gray)),
+        ]
+    stages.append(("pipeline:compose+pack", pipeline))
+    return stages
+
+
+def measure(func, iterations, warmup=3):
+    """Return {min_ms, median_ms, p95_ms, peak_kib} for `func`."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - t0) * 1000)
+    # Separate traced run: tracemalloc slows allocation-heavy code down
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    samples.sort()
+    p95 = samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))]
+    return {
+        "min_ms": round(samples[0], 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(p95, 3),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Return list of regression messages (empty when within budget)."""
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        limit = base["median_ms"] * (1 + tolerance)
+        if stats["median_ms"] > limit and stats["median_ms"] - base["median_ms"] > min_delta_ms:
+            regressions.append(f"{name}: median {stats['median_ms']:.2f}ms > baseline {base['median_ms']:.2f}ms (+{tolerance:.0%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--iterations", type=int, default=50)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative median regression")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="ignore regressions smaller than this")
+    args = parser.parse_args(argv)
+
+    load_fixtures()
+    results = {}
+    print(f"{'stage':<26}{'min':>9}{'median':>9}{'p95':>9}{'peak KiB':>10}")
+    for name, func in build_stages():
+        stats = measure(func, args.iterations)
+        results[name] = stats
+        print(f"{name:<26}{stats['min_ms']:>9.2f}{stats['median_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['peak_kib']:>10.1f}")
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"[BENCH] {args.iterations} iterations/stage, process max RSS {max_rss / 1024:.1f} MiB")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"[BENCH] Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("[BENCH] No baseline stored; run with --save-baseline to create one")
+        return 0
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+    for message in regressions:
+        print(f"[BENCH][REGRESSION] {message}")
+    if regressions:
+        return 1
+    print("[BENCH] Within baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
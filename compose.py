@@ -6,51 +6,163 @@ use `compose_panel()` so the layout stays in sync.
 Keep layout constants (WIDTH/HEIGHT/PADDING) here to avoid magic numbers.
 Each draw_* function receives a shared ImageDraw instance and top‑left anchor.
 Sections are resilient: failures are caught and logged.
+Remote data comes from `providers` snapshots; composing never touches the network.
+
+Every section renders into its own tile (a non-overlapping box of the panel).
+A tile is cached together with a fingerprint of the data it was drawn from, so
+a compose only redraws sections whose data changed (e.g. one device icon after
+an MQTT message) and pastes the rest.
+
+Data-independent chrome (section titles, detail glyphs) is drawn once into a
+static layer. It is the starting canvas of every compose and of every tile, so
+`draw_*` functions only draw their dynamic parts.
+
+Sections backed by a provider also take its staleness: when the data is older
+than the provider's `max_stale`, a small marker glyph is drawn in the tile's
+top-right corner (the flag is part of the fingerprint).
 """
 
+from datetime import datetime
+from typing import Any, Callable, NamedTuple, Optional, Tuple
 from PIL import Image, ImageDraw
-from devices import draw_device_icons
-from weather import draw_weather
-from electricity_price import draw_electricity_price
-from dishes import draw_weekly_dishes
+from devices import draw_device_icons, DEVICES
+from weather import draw_weather, draw_weather_static
+from electricity_price import draw_electricity_price, draw_electricity_static
+from dishes import draw_weekly_dishes, draw_weekly_dishes_static
 from garbage import draw_garbage_collection
 from last_update import draw_last_update
-from typing import Callable
+from providers import get_snapshot, is_stale
+from gui_constant import colors, small_icon_font, small_icon_size
+from glyph_cache import draw_text
+import tracing
 
 WIDTH, HEIGHT = 800, 480
 PADDING = 16
+STALE_GLYPH = "\ue2c1"  # cloud_off: section shows old data
+
+
+class Section(NamedTuple):
+    label: str
+    draw: Callable  # draw_*(draw, pos, data)
+    data: Callable[[datetime], Any]  # data(now) consumed by `draw` (also the cache fingerprint)
+    box: Tuple[int, int, int, int]  # tile bounds on the panel (x1, y1, x2, y2)
+    anchor: Tuple[int, int]  # position passed to `draw`, in panel coordinates
+    static: Optional[Callable] = None  # draw_*_static(draw, pos) for the static layer
+    stale: Optional[Callable[[], bool]] = None  # True -> draw the stale marker over the tile
+
+
+SECTIONS = (
+    # Devices (left column)
+    Section("devices", draw_device_icons, lambda now: DEVICES,
+            (0, 0, PADDING + 36 * 2, HEIGHT), (PADDING, PADDING)),
+    # Weather (center-left)
+    Section("weather", draw_weather, lambda now: get_snapshot("weather"),
+            (PADDING + 36 * 2, 0, PADDING + 500, PADDING + 266), (PADDING + 36 * 2, PADDING),
+            draw_weather_static, lambda: is_stale("weather")),
+    # Electricity price + consumption (right top)
+    Section("electricity", draw_electricity_price, lambda now: get_snapshot("electricity"),
+            (PADDING + 500, 0, WIDTH, PADDING + 296), (PADDING + 500, PADDING),
+            draw_electricity_static, lambda: is_stale("electricity")),
+    # Weekly dishes (below weather)
+    Section("dishes", draw_weekly_dishes, lambda now: get_snapshot("dishes"),
+            (PADDING + 36 * 2, PADDING + 266, PADDING + 500, HEIGHT), (PADDING + 36 * 2, PADDING + 270),
+            draw_weekly_dishes_static, lambda: is_stale("dishes")),
+    # Garbage collection (below electricity charts)
+    Section("garbage", draw_garbage_collection, lambda now: now.strftime("%Y-%m-%d"),
+            (PADDING + 500, PADDING + 296, WIDTH, HEIGHT - 32), (PADDING + 500, PADDING + 280)),
+    # Last updated timestamp (bottom-right corner)
+    Section("last_update", draw_last_update, lambda now: now.replace(microsecond=0),
+            (PADDING + 500, HEIGHT - 32, WIDTH, HEIGHT), (WIDTH - PADDING, HEIGHT - PADDING)),
+)
 
-def _safe(func: Callable, label: str, *args, **kwargs):
-    """Execute a drawing function; log and continue on any error."""
+# label -> (fingerprint, tile image); only touched from compose_panel (callers serialize renders)
+_TILE_CACHE = {}
+# (layout key, static layer image)
+_STATIC_LAYER = (None, None)
+
+
+def _safe(func: Callable, label: str, *args, **kwargs) -> bool:
+    """Execute a drawing function; log and continue on any error. Return True on success."""
     try:
-        func(*args, **kwargs)
+        with tracing.span(label, "compose"):
+            func(*args, **kwargs)
+        return True
     except Exception as e:  # noqa: BLE001 (broad ok: we want to catch all rendering issues)
         print(f"[COMPOSE][ERROR] Section '{label}' failed: {e}")
+        return False
 
 
-def compose_panel():
-    """Return a fully rendered grayscale PIL Image ready for saving or display."""
-    image = Image.new("L", (WIDTH, HEIGHT), 255)
-    draw = ImageDraw.Draw(image)
+def _draw_stale_marker(draw, width: int):
+    """Draw the stale marker in the top-right corner of a tile `width` pixels wide."""
+    draw_text(draw, (width - small_icon_size - PADDING, 4), STALE_GLYPH, font=small_icon_font, fill=colors["black"])
 
-    # Devices (left column)
-    _safe(draw_device_icons, "devices", draw, (PADDING, PADDING))
 
-    # Weather (center-left)
-    _safe(draw_weather, "weather", draw, (PADDING + 36 * 2, PADDING))
+def _static_layer():
+    """Return the static layer, rebuilding it (and dropping all tiles) when the layout changed."""
+    global _STATIC_LAYER
+    key = tuple((s.label, s.box, s.anchor, s.static) for s in SECTIONS)
+    if _STATIC_LAYER[0] != key:
+        image = Image.new("L", (WIDTH, HEIGHT), 255)
+        draw = ImageDraw.Draw(image)
+        for section in SECTIONS:
+            if section.static is not None:
+                _safe(section.static, f"{section.label} (static)", draw, section.anchor)
+        _STATIC_LAYER = (key, image)
+        _TILE_CACHE.clear()
+    return _STATIC_LAYER[1]
 
-    # Electricity price + consumption (right top)
-    _safe(draw_electricity_price, "electricity", draw, (PADDING + 500, PADDING))
 
-    # Weekly dishes (below weather)
-    _safe(draw_weekly_dishes, "dishes", draw, (PADDING + 36 * 2, PADDING + 270))
+def _section_tile(section: Section, static, now: datetime):
+    """Return the tile for `section`, redrawing it only when its data fingerprint changed."""
+    try:
+        data = section.data(now)
+        stale = section.stale is not None and section.stale()
+    except Exception as e:  # noqa: BLE001
+        print(f"[COMPOSE][ERROR] Section '{section.label}' data failed: {e}")
+        cached = _TILE_CACHE.get(section.label)
+        return cached[1] if cached else None
 
-    # Garbage collection (below electricity charts)
-    _safe(draw_garbage_collection, "garbage", draw, (PADDING + 500, PADDING + 280))
+    fingerprint = repr((data, stale))
+    cached = _TILE_CACHE.get(section.label)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
 
-    # Last updated timestamp (bottom-right corner)
-    _safe(draw_last_update, "last_update", draw, (WIDTH - PADDING, HEIGHT - PADDING))
+    x1, y1, x2, y2 = section.box
+    tile = static.crop(section.box)
+    pos = (section.anchor[0] - x1, section.anchor[1] - y1)
+    draw = ImageDraw.Draw(tile)
+    ok = _safe(section.draw, section.label, draw, pos, data)
+    if stale:
+        ok = _safe(_draw_stale_marker, f"{section.label} (stale)", draw, x2 - x1) and ok
+    if ok:
+        _TILE_CACHE[section.label] = (fingerprint, tile)
+    else:
+        # Keep the partial drawing for this frame but retry on the next compose
+        _TILE_CACHE.pop(section.label, None)
+    return tile
+
+
+def invalidate_tiles():
+    """Drop all cached tiles and the static layer (next compose redraws everything)."""
+    global _STATIC_LAYER
+    _STATIC_LAYER = (None, None)
+    _TILE_CACHE.clear()
+
+
+def compose_panel(now: Optional[datetime] = None):
+    """Return a fully rendered grayscale PIL Image ready for saving or display.
 
+    `now` overrides the wall clock (garbage dates, timestamp) for reproducible frames.
+    """
+    if now is None:
+        now = datetime.now()
+    with tracing.span("compose_panel", "compose"):
+        static = _static_layer()
+        image = static.copy()
+        for section in SECTIONS:
+            tile = _section_tile(section, static, now)
+            if tile is not None:
+                image.paste(tile, section.box[:2])
     return image
 
-__all__ = ["compose_panel", "WIDTH", "HEIGHT", "PADDING"]
+__all__ = ["compose_panel", "invalidate_tiles", "SECTIONS", "WIDTH", "HEIGHT", "PADDING"]
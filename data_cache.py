@@ -0,0 +1,218 @@
+"""Two-tier cache for the remote data sources (weather, electricity, dishes).
+
+Each source owns one `DataCache`. The last good payload is kept in memory and
+persisted to `<name>_cache.json` next to the code, written atomically (temp
+file, fsync, `os.replace`, directory fsync) so a power cut mid-write never
+leaves a truncated or empty cache on the SD card. The file is parsed at most once per process; later hits are
+served from memory. A source that changes its payload format bumps `version`,
+so files in the old format are ignored instead of misread.
+
+Freshness is a per-source policy `policy(age, now) -> bool`: `ttl(seconds)`, or
+`publication_window(...)` for sources that publish once a day (Tibber's
+day-ahead prices, 13-15).
+
+`get(fetch)` refreshes an expired entry by calling `fetch()`; a failed fetch
+returns the last good entry, so callers only get None when there never was
+one. Two modes:
+
+- `background=False` (providers): block on `fetch()`. Providers already fetch
+  on their own pool with deadlines, so a slow fetch never reaches a render and
+  the new value is published as soon as it arrives.
+- `background=True` (default, direct callers): stale-while-revalidate. The
+  expired entry is returned immediately and refreshed on a daemon thread;
+  `wait_for_revalidation()` lets a one-shot caller wait for it before exiting.
+  Only a cache with nothing to serve (first run, no file) blocks.
+
+Both are single-flight: concurrent callers share one disk load and one
+`fetch()` instead of each hitting the SD card/network. After a failed fetch the
+stale entry is served without new attempts for `retry_interval` seconds, so an
+outage doesn't turn every refresh or render into an API call.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Optional
+
+CACHE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+logger = logging.getLogger(__name__)
+
+# Seconds between fetch attempts for an expired entry after a failed one
+RETRY_INTERVAL = 60
+
+# name -> DataCache, so consumers (providers) can read an entry's age
+CACHES = {}
+
+
+def ttl(seconds: float):
+    """Policy: fresh while younger than `seconds`."""
+    return lambda age, now: age < seconds
+
+
+def publication_window(start_hour: int, end_hour: int, window_ttl: float, max_age: float):
+    """Policy for data published once a day between `start_hour` and `end_hour` (local time).
+
+    Inside the window entries expire after `window_ttl` so the new release is
+    picked up soon; outside it any entry younger than `max_age` stays fresh.
+    """
+    def fresh(age, now):
+        if age > max_age:
+            return False
+        if start_hour <= time.localtime(now).tm_hour < end_hour:
+            return age < window_ttl
+        return True
+    return fresh
+
+
+class DataCache:
+    """Memory + JSON file cache for one source, refreshed through `get(fetch)`."""
+
+    def __init__(self, name: str, policy: Callable[[float, float], bool], path: Optional[str] = None,
+                 version: int = 0, retry_interval: float = RETRY_INTERVAL):
+        self.name = name
+        self.policy = policy
+        # Payload format; a file written with another version is ignored (a miss)
+        self.version = version
+        self.path = path or os.path.join(CACHE_DIR, f"{name}_cache.json")
+        # (payload, time.time() of its fetch); replaced as a whole so readers never mix two entries
+        self._entry = (None, 0.0)
+        self._loaded = False
+        # Serializes disk load + fetch (single flight)
+        self._lock = threading.Lock()
+        # Completed fetch attempts; lets waiters reuse an attempt that ran while they blocked
+        self._attempts = 0
+        # Background refresh of an expired entry (at most one at a time)
+        self._revalidating: Optional[threading.Thread] = None
+        self._revalidate_lock = threading.Lock()
+        self.retry_interval = retry_interval
+        # time.monotonic() of the last failed fetch (None after a success)
+        self._failed_at: Optional[float] = None
+        CACHES[name] = self
+
+    def fresh(self, now: Optional[float] = None) -> bool:
+        value, timestamp = self._entry
+        now = time.time() if now is None else now
+        return value is not None and self.policy(now - timestamp, now)
+
+    def peek(self):
+        """Return (payload, fetch timestamp) of the last good entry, fresh or not ((None, 0.0) if none)."""
+        return self._entry
+
+    def get(self, fetch: Callable[[], Any], background: bool = True):
+        """Return the last good payload, refreshing it through `fetch()` when expired.
+
+        `background=True` returns an expired entry as is while `fetch()` runs on a
+        daemon thread (check `peek()` for its age); `background=False` blocks on
+        `fetch()`. Without any entry the call always blocks (at most once across
+        threads). `fetch` returns the new payload or None on failure; failures
+        keep and return the previous entry (None if there is none).
+        """
+        attempts = self._attempts
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._load()
+        value = self._entry[0]
+        if value is not None:
+            if self.fresh() or self._backing_off():
+                return value
+            if background:
+                self._revalidate(fetch)
+                return value
+        with self._lock:
+            if self.fresh() or self._attempts != attempts:
+                # Fresh by now, or a fetch finished (and failed) while we waited
+                return self._entry[0]
+            value = self._fetch(fetch)
+            return value if value is not None else self._entry[0]
+
+    def _backing_off(self) -> bool:
+        """True within `retry_interval` seconds of a failed fetch."""
+        failed_at = self._failed_at
+        return failed_at is not None and time.monotonic() - failed_at < self.retry_interval
+
+    def _fetch(self, fetch):
+        """Run `fetch()` and store its payload (caller holds `_lock`)."""
+        value = None
+        try:
+            value = fetch()
+        finally:
+            self._attempts += 1
+            if value is None:
+                self._failed_at = time.monotonic()
+        if value is None:
+            return None
+        self._failed_at = None
+        self._entry = (value, time.time())
+        self._save()
+        return value
+
+    def _revalidate(self, fetch):
+        """Refresh the expired entry on a background thread unless one is running."""
+        with self._revalidate_lock:
+            if self._revalidating is not None and self._revalidating.is_alive():
+                return
+            # Daemon: a hung fetch must not block interpreter exit
+            self._revalidating = threading.Thread(target=self._run_revalidate, args=(fetch,),
+                                                  name=f"revalidate-{self.name}", daemon=True)
+            self._revalidating.start()
+
+    def wait_for_revalidation(self, timeout: float):
+        """Wait up to `timeout` seconds for a running background refresh."""
+        thread = self._revalidating
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run_revalidate(self, fetch):
+        try:
+            with self._lock:
+                if not self.fresh():
+                    self._fetch(fetch)
+        except Exception as e:  # noqa: BLE001 (background refresh must not die loudly)
+            logger.error("Refreshing %s failed: %s", self.name, e)
+
+    def _load(self):
+        self._loaded = True
+        try:
+            with open(self.path, "r") as f:
+                cache = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:  # noqa: BLE001 (corrupt cache = miss)
+            logger.error("Reading %s cache failed: %s", self.name, e)
+            return
+        if cache.get("version", 0) != self.version:
+            return
+        if cache.get("data") is not None:
+            self._entry = (cache["data"], float(cache.get("timestamp", 0)))
+
+    def _save(self):
+        value, timestamp = self._entry
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump({"version": self.version, "timestamp": timestamp, "data": value}, f)
+                # Data on disk before the rename (ext4 delayed allocation could otherwise leave 0 bytes)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            # Persist the rename itself
+            directory = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+            try:
+                os.fsync(directory)
+            finally:
+                os.close(directory)
+        except Exception as e:  # noqa: BLE001 (cache is best effort)
+            logger.error("Writing %s cache failed: %s", self.name, e)
+
+
+def wait_for_revalidation(timeout: float):
+    """Wait (at most `timeout` seconds overall) for every cache's background refresh."""
+    deadline = time.monotonic() + timeout
+    for cache in list(CACHES.values()):
+        cache.wait_for_revalidation(max(0.0, deadline - time.monotonic()))
+
+
+__all__ = ["DataCache", "wait_for_revalidation", "RETRY_INTERVAL", "ttl", "publication_window", "CACHE_DIR", "CACHES"]
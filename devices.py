@@ -6,6 +6,7 @@ Each device dict contains: label, topic, icon glyph, and current boolean `on`.
 
 from PIL import Image, ImageDraw
 from gui_constant import colors, icon_size, icon_font
+from glyph_cache import draw_text
 from config import DEVICES_CONFIG
 
 # Optional hardware LED (GPIO2) to indicate Motorvärmare status (ignored if unavailable).
@@ -45,16 +46,21 @@ def find_motorvarmare():
             return d
     return None
 
-def draw_device_icons(draw, pos):
-    """Draw vertical list of device icons at anchor `pos` (x, y)."""
+def draw_device_icons(draw, pos, devices=None):
+    """Draw vertical list of device icons at anchor `pos` (x, y).
+
+    `devices` defaults to the global `DEVICES` list.
+    """
+    if devices is None:
+        devices = DEVICES
     box_padding = 4
     box_height = icon_size + box_padding * 2
 
     icon_y_offset = pos[1]
-    for device in DEVICES:
+    for device in devices:
         y = icon_y_offset
         icon_color = colors["black"] if device.get("on") else colors["light_gray"]
-        draw.text((pos[0], y), device.get("icon", "?"), font=icon_font, fill=icon_color)
+        draw_text(draw, (pos[0], y), device.get("icon", "?"), font=icon_font, fill=icon_color)
 
         icon_y_offset += box_height
 
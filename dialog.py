@@ -1,30 +1,16 @@
 """Dialog helper building a simple boxed message image (optional drop shadow).
 
-Greedy word wrapping; limits lines to avoid overflow. Reusable without hardware.
+Greedy word wrapping (linear, see `text_metrics.wrap_text`); limits lines to avoid
+overflow. Reusable without hardware.
 """
 from typing import List
 from PIL import Image, ImageDraw
 from gui_constant import text_font, colors
+from text_metrics import text_bbox, wrap_text
 
 
 def _wrap_text(draw: ImageDraw.ImageDraw, text: str, max_width: int, max_lines: int = 6) -> List[str]:
-    words = text.split()
-    lines: List[str] = []
-    current = ""
-    for w in words:
-        candidate = (current + " " + w).strip()
-        bbox = draw.textbbox((0, 0), candidate, font=text_font)
-        if bbox[2] - bbox[0] <= max_width:
-            current = candidate
-        else:
-            if current:
-                lines.append(current)
-            current = w
-        if len(lines) >= max_lines - 1:  # reserve space for last line
-            break
-    if current and len(lines) < max_lines:
-        lines.append(current)
-    return lines
+    return wrap_text(text, text_font, max_width, max_lines)
 
 
 def build_dialog_image(
@@ -91,7 +77,7 @@ def build_dialog_image(
 
     max_text_width = width - padding * 2
     lines = _wrap_text(draw, text, max_text_width)
-    line_height = draw.textbbox((0, 0), "Hg", font=text_font)[3]
+    line_height = text_bbox("Hg", text_font)[3]
     y_cursor = padding
     for line in lines:
         if y_cursor + line_height > height - padding:
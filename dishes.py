@@ -1,35 +1,15 @@
 import os
-import json
-import time
-import urllib.request
 import urllib.error
+import http_client
+import data_cache
 from gui_constant import colors, text_font, text_size
+from glyph_cache import draw_text
+from text_metrics import text_width
 from config import CACHE_DURATION, API_TIMEOUT, DISHES_API_URL
 
 # Cache file path co-located with this script
 _CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dishes_cache.json")
-
-def _read_cache():
-    try:
-        if os.path.exists(_CACHE_FILE):
-            with open(_CACHE_FILE, "r") as f:
-                data = json.load(f)
-            if time.time() - data.get("timestamp", 0) < CACHE_DURATION:
-                cached_list = data.get("dishes", [])
-                if isinstance(cached_list, list) and cached_list:
-                    return cached_list
-    except Exception as e:
-        print(f"dishes cache read error: {e}")
-    return None
-
-def _write_cache(dishes_list):
-    try:
-        tmp_path = _CACHE_FILE + ".tmp"
-        with open(tmp_path, "w") as f:
-            json.dump({"timestamp": time.time(), "dishes": dishes_list}, f)
-        os.replace(tmp_path, _CACHE_FILE)  # atomic replace
-    except Exception as e:
-        print(f"dishes cache write error: {e}")
+_cache = data_cache.DataCache("dishes", data_cache.ttl(CACHE_DURATION), _CACHE_FILE)
 
 def _fetch_remote_dishes():
     """Fetch list of dish names from remote endpoint.
@@ -39,10 +19,7 @@ def _fetch_remote_dishes():
     """
     url = DISHES_API_URL
     try:
-        req = urllib.request.Request(url)
-        with urllib.request.urlopen(req, timeout=API_TIMEOUT) as resp:
-            raw = resp.read().decode("utf-8")
-        data = json.loads(raw)
+        data = http_client.get(url, timeout=API_TIMEOUT, conditional=True).json()
         if isinstance(data, list):
             return data
     except urllib.error.HTTPError as e:
@@ -53,18 +30,10 @@ def _fetch_remote_dishes():
         print(f"dishes fetch error: {e}")
     return None
 
-def get_dishes():
-    # 1. Try cache
-    dishes_list = _read_cache()
-
-    # 2. If no valid cache, attempt remote fetch
-    if dishes_list is None:
-        fetched = _fetch_remote_dishes()
-        if fetched:
-            _write_cache(fetched)
-            return fetched
-
-    return dishes_list
+def get_dishes(background=True):
+    # Cache first, remote fetch when stale (an empty list counts as a failed fetch);
+    # `background`: see DataCache.get (providers pass False and fetch blocking)
+    return _cache.get(lambda: _fetch_remote_dishes() or None, background)
 
 
 def _truncate(text: str, limit: int = 40) -> str:
@@ -78,12 +47,13 @@ def _truncate(text: str, limit: int = 40) -> str:
     cut = max(0, limit - 1)
     return text[:cut].rstrip() + "…"
 
-def draw_weekly_dishes(draw, pos):
-    # Draw section title
-    draw.text((pos[0], pos[1]), "Veckans mat", font=text_font, fill=colors["black"])
+def draw_weekly_dishes_static(draw, pos):
+    """Draw the section title (static layer)."""
+    draw_text(draw, (pos[0], pos[1]), "Veckans mat", font=text_font, fill=colors["black"])
 
-    # Dynamic data retrieval (cached remote or fallback)
-    dishes = get_dishes()
+def draw_weekly_dishes(draw, pos, dishes):
+    # Title is drawn once by draw_weekly_dishes_static (static layer)
+    # `dishes` is the provider snapshot (cached remote list, empty if unavailable)
 
     # Calculate positions and spacing
     title_height = text_size + 8
@@ -94,8 +64,7 @@ def draw_weekly_dishes(draw, pos):
     for i, item in enumerate(dishes):
         dish_y = start_y + i * dish_height
         dish_text = _truncate(item, 40)
-        draw.text((pos[0], dish_y), "- " + dish_text, font=text_font, fill=colors["black"])
+        draw_text(draw, (pos[0], dish_y), "- " + dish_text, font=text_font, fill=colors["black"])
 
 def get_text_width(draw, text, font):
-    bbox = draw.textbbox((0, 0), text, font=font)
-    return bbox[2] - bbox[0]
+    return text_width(text, font)
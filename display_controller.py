@@ -1,6 +1,25 @@
 """DisplayController: encapsulates E-Ink rendering (full render + debounced scheduling + dialogs).
 
 Keep lean for Pi Zero W; EPD driver instance injected for easier testing/mocking.
+
+Frames are packed to 1 bit per pixel either with the ordered-dither packer
+(`output_mode="ordered"`, default: fast, deterministic patterns that diff well) or
+with the driver's `getbuffer()` (`output_mode="driver"`, Floyd–Steinberg).
+
+The last pushed frame is kept in packed 1-bit form. Each
+new frame is diffed against it and the refresh mode is picked automatically:
+nothing changed -> panel untouched, small regions -> partial refresh per dirty
+rect, otherwise the requested full/fast refresh.
+
+Panel session: after a refresh the panel stays powered and initialized for
+`session_idle` seconds, so a burst of updates skips reset + power-on and the
+2 s deep-sleep delay; it is re-initialized only when the refresh mode changes.
+When idle, a timer puts it into deep sleep (`session_idle=0`: after every refresh).
+
+`full_refresh="4gray"` makes `render()` use the panel's native 4-gray waveform
+(black, dark gray, light gray, white: palette grays aren't dithered) instead of
+the 1-bit full refresh. Partial diffs are 1-bit only, so the update after a gray
+frame is always a whole-panel one.
 """
 
 import threading
@@ -8,14 +27,44 @@ import time
 from dialog import build_dialog_image
 from config import MQTT_RENDER_DEBOUNCE_SECONDS
 from compose import compose_panel
+from frame_diff import dirty_rects, crop, area
+from glyph_cache import cache_stats
+from dither import pack_ordered
+import tracing
+
+# Partial refresh policy
+PARTIAL_MAX_FRACTION = 0.25  # max share of the panel (sum of dirty rects) refreshed partially
+PARTIAL_MAX_RECTS = 3        # more separate regions than this -> one fast/full refresh instead
+PARTIAL_LIMIT = 10           # consecutive partial refreshes before forcing a full waveform (ghosting)
+
+# Seconds the panel stays powered after the last refresh before deep sleep
+# (0 = sleep after every refresh). Keep short: the panel shouldn't stay powered for long.
+SESSION_IDLE_SECONDS = 60
+
+
+def _glyph_stats() -> str:
+    stats = cache_stats()
+    return f"glyphs hit/miss={stats['hits']}/{stats['misses']} size={stats['size']}"
 
 
 class DisplayController:
 
-    def __init__(self, epd):
-        """Bind controller to provided EPD instance (can be a mock)."""
+    def __init__(self, epd, output_mode: str = "ordered", session_idle: float = SESSION_IDLE_SECONDS,
+                 full_refresh: str = "full"):
+        """Bind controller to provided EPD instance (can be a mock).
+
+        `output_mode`: "ordered" (ordered dither, packed here) or "driver" (`epd.getbuffer`).
+        `session_idle`: seconds to keep the panel awake between updates (0 = always sleep).
+        `full_refresh`: waveform used by `render()`, "full" (1-bit) or "4gray".
+        """
+        if output_mode not in ("ordered", "driver"):
+            raise ValueError(f"Unknown output_mode: {output_mode}")
+        if full_refresh not in ("full", "4gray"):
+            raise ValueError(f"Unknown full_refresh: {full_refresh}")
         # Core hardware driver (Waveshare EPD instance) provided by caller
-        self._epd = epd
+        self._epd = tracing.instrument_epd(epd)
+        self._output_mode = output_mode
+        self._full_refresh = full_refresh
         # Mutex guarding any interaction with the panel (full + partial renders)
         self._render_lock = threading.Lock()
         # Event used to signal shutdown to background timers
@@ -25,8 +74,19 @@ class DisplayController:
         # Counter of all display operations (full + partial + dialog show/restore)
         # Used to decide when to do a full clear or force full render to mitigate ghosting.
         self._render_count = 0
+        # Partial refreshes since the last full/fast waveform
+        self._partial_count = 0
+        # Packed 1-bit copy of what is currently on the panel (None = unknown, forces full)
+        self._last_frame = None
+        # Packed 2-bit copy when the panel shows a 4-gray frame (skips identical re-renders)
+        self._last_gray = None
         # Active timer for restoring dialog region; presence means a dialog is currently visible.
         self._dialog_restore_timer = None
+        self._session_idle = session_idle
+        # Init mode the panel is powered in ("full", "fast", "part", "4gray"); None = deep sleep
+        self._panel_mode = None
+        # Pending idle -> deep sleep timer
+        self._sleep_timer = None
         print("[DISPLAY] Controller constructed")
 
     def stop(self):
@@ -36,41 +96,163 @@ class DisplayController:
                 self._render_timer.cancel()
         except Exception:
             pass
+        with self._render_lock:
+            self._cancel_sleep_timer()
+            if self._panel_mode is not None:
+                self._sleep_panel()
+        tracing.flush()
         print("[DISPLAY] Controller stopped")
 
     # ---- Rendering ----
     def render(self):
-        """Full panel render (slow init + optional clear)."""
-        with self._render_lock:
-            # Every 10th render: do a clear after init to reduce ghosting
-            self._epd.init()
-            do_clear = False
-            do_clear = (self._render_count % 10 == 0)
-            if do_clear:
-                self._epd.Clear()
+        """Panel render: full refresh (slow init + periodic clear) unless only small regions changed."""
+        with self._render_lock, tracing.span("render", "display"):
             t0 = time.perf_counter()
             img = compose_panel()
             dt_ms = (time.perf_counter() - t0) * 1000
-            self._epd.display(self._epd.getbuffer(img))
-            self._epd.sleep()
-            # keep a copy for potential partial overlays (dialogs, etc.)
-            self._last_image = img.copy()
-            self._render_count += 1
-            print(f"[RENDER] Full update done (count={self._render_count}, clear={do_clear}, compose={dt_ms:.1f}ms)")
+            mode = self._refresh(img, self._full_refresh)
+            print(f"[RENDER] Update done (mode={mode}, count={self._render_count}, compose={dt_ms:.1f}ms, {_glyph_stats()})")
+        tracing.flush()
 
     def fast_render(self):
-        """Full panel render using fast init (no clear)."""
-        with self._render_lock:
-            self._epd.init_fast()
+        """Panel render using fast init (no clear) unless only small regions changed."""
+        with self._render_lock, tracing.span("fast_render", "display"):
             t0 = time.perf_counter()
             img = compose_panel()
             dt_ms = (time.perf_counter() - t0) * 1000
-            self._epd.display(self._epd.getbuffer(img))
-            self._epd.sleep()
-            # keep a copy for potential partial overlays (dialogs, etc.)
-            self._last_image = img.copy()
-            self._render_count += 1
-            print(f"[RENDER-FAST] Full update done (count={self._render_count}, compose={dt_ms:.1f}ms)")
+            mode = self._refresh(img, "fast")
+            print(f"[RENDER-FAST] Update done (mode={mode}, count={self._render_count}, compose={dt_ms:.1f}ms, {_glyph_stats()})")
+        tracing.flush()
+
+    def _refresh(self, img, mode: str) -> str:
+        """Push `img` to the panel; `mode` ("full"/"fast") is used when a partial refresh won't do.
+
+        Must be called with `_render_lock` held. Returns the mode actually used
+        ("none", "partial", "fast", "full", "full+clear" or "4gray").
+        """
+        if mode == "4gray":
+            return self._refresh_gray(img)
+        with tracing.span(f"pack.{self._output_mode}", "pack"):
+            buf = self._pack(img)
+        rects = self._dirty_rects(buf)
+        if rects == []:
+            return "none"
+
+        # Panel content is unknown until the refresh below completes
+        self._last_frame = None
+        self._last_gray = None
+        row_bytes = self._epd.width // 8
+        if (
+            rects is not None
+            and self._partial_count < PARTIAL_LIMIT
+            and len(rects) <= PARTIAL_MAX_RECTS
+            and sum(area(r) for r in rects) <= PARTIAL_MAX_FRACTION * self._epd.width * self._epd.height
+        ):
+            self._ensure_mode("part")
+            for rect in rects:
+                self._epd.display_Partial(crop(buf, rect, row_bytes), *rect)
+            self._partial_count += 1
+            used = "partial"
+        elif mode == "full":
+            self._ensure_mode("full")
+            # Every 10th render: do a clear after init to reduce ghosting
+            do_clear = (self._render_count % 10 == 0)
+            if do_clear:
+                self._epd.Clear()
+            self._epd.display(buf)
+            self._partial_count = 0
+            used = "full+clear" if do_clear else "full"
+        else:
+            self._ensure_mode("fast")
+            self._epd.display(buf)
+            self._partial_count = 0
+            used = "fast"
+        self._end_session()
+
+        if isinstance(buf, (bytes, bytearray, memoryview)):
+            self._last_frame = bytes(buf)
+        # keep a copy for potential partial overlays (dialogs, etc.)
+        self._last_image = img.copy()
+        self._render_count += 1
+        tracing.instant(f"refresh.{used}", "display", rects=len(rects or ()))
+        return used
+
+    def _refresh_gray(self, img) -> str:
+        """Push `img` with the 4-gray waveform (whole panel). Same contract as `_refresh`."""
+        with tracing.span("pack.4gray", "pack"):
+            buf = bytes(self._epd.getbuffer_4Gray(img))
+        if buf == self._last_gray:
+            return "none"
+        self._last_frame = None
+        self._last_gray = None
+        self._ensure_mode("4gray")
+        self._epd.display_4Gray(buf)
+        self._partial_count = 0
+        self._end_session()
+
+        self._last_gray = buf
+        self._last_image = img.copy()
+        self._render_count += 1
+        tracing.instant("refresh.4gray", "display")
+        return "4gray"
+
+    # ---- Panel session ----
+    def _ensure_mode(self, mode: str):
+        """Initialize the panel for `mode` unless it is already awake in that mode."""
+        self._cancel_sleep_timer()
+        if self._panel_mode == mode:
+            return
+        # Mark unknown first: a failing init must not leave a stale mode behind
+        self._panel_mode = None
+        {
+            "full": self._epd.init,
+            "fast": self._epd.init_fast,
+            "part": self._epd.init_part,
+            "4gray": self._epd.init_4Gray,
+        }[mode]()
+        self._panel_mode = mode
+
+    def _end_session(self):
+        """Deep-sleep now, or arm the idle timer that does it later."""
+        if self._session_idle <= 0:
+            self._sleep_panel()
+            return
+        timer = threading.Timer(self._session_idle, lambda: self._idle_sleep(timer))
+        timer.daemon = True
+        self._sleep_timer = timer
+        timer.start()
+
+    def _idle_sleep(self, timer):
+        with self._render_lock:
+            # A refresh may have re-armed (or cancelled) the timer while we waited for the lock
+            if self._sleep_timer is not timer or self._panel_mode is None:
+                return
+            self._sleep_timer = None
+            self._sleep_panel()
+            print(f"[DISPLAY] Panel asleep after {self._session_idle}s idle")
+
+    def _sleep_panel(self):
+        self._panel_mode = None
+        self._epd.sleep()
+
+    def _cancel_sleep_timer(self):
+        if self._sleep_timer is not None:
+            self._sleep_timer.cancel()
+            self._sleep_timer = None
+
+    def _pack(self, img):
+        """Return the packed 1-bit panel buffer for `img` according to the output mode."""
+        if self._output_mode == "ordered":
+            return pack_ordered(img, self._epd.width, self._epd.height)
+        return self._epd.getbuffer(img)
+
+    def _dirty_rects(self, buf):
+        """Return dirty rects vs. the panel content, or None when unknown (forces a full refresh)."""
+        if self._last_frame is None or not isinstance(buf, (bytes, bytearray, memoryview)):
+            return None
+        if len(buf) != len(self._last_frame):
+            return None
+        return dirty_rects(self._last_frame, buf, self._epd.width // 8)
 
     def schedule_render(self):
         """Debounced full render (cancels previous timer)."""
@@ -114,10 +296,9 @@ class DisplayController:
             base = compose_panel()
             base.paste(dialog_img, (x1, y1))
 
-            self._epd.init_fast()
-            self._epd.display(self._epd.getbuffer(base))
-            self._epd.sleep()
-            print(f"[DIALOG] Shown at bbox={bbox} for {duration}s (count={self._render_count})")
+            with tracing.span("dialog", "display"):
+                mode = self._refresh(base, "fast")
+            print(f"[DIALOG] Shown at bbox={bbox} for {duration}s (mode={mode}, count={self._render_count})")
 
             # Schedule restore
             def _restore():
@@ -129,3 +310,4 @@ class DisplayController:
             self._dialog_restore_timer = threading.Timer(duration, _restore)
             self._dialog_restore_timer.daemon = True
             self._dialog_restore_timer.start()
+        tracing.flush()
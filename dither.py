@@ -0,0 +1,62 @@
+"""Direct 1-bit packing with ordered (Bayer) dithering.
+
+`EPD.getbuffer()` converts with `convert('1')`, i.e. Floyd–Steinberg error
+diffusion over every pixel. That is slow on the Pi Zero and unstable: one changed
+icon shifts the dither pattern of everything below it, which defeats the partial
+refresh differ. Here each pixel is compared to a fixed 4x4 Bayer threshold tiled
+from the panel origin, so a palette gray always maps to the same pattern:
+
+    white 255 -> white, light_gray 170 -> 5/16 black, dark_gray 85 -> 11/16 black, black 0 -> black
+
+All work is done by Pillow in C (one subtract + one LUT point) and the result is
+already in panel polarity (1 = black), packed MSB first like `getbuffer()`.
+"""
+from PIL import Image, ImageChops
+
+# 4x4 Bayer matrix (rank of each cell)
+_BAYER_4 = (
+    (0, 8, 2, 10),
+    (12, 4, 14, 6),
+    (3, 11, 1, 9),
+    (15, 7, 13, 5),
+)
+# Pixel is black when value <= threshold (thresholds spread evenly over 0..255)
+_THRESHOLDS = [[round((rank + 0.5) * 255 / 16) for rank in row] for row in _BAYER_4]
+# (threshold + 1) - value > 0  <=>  value <= threshold  -> black (1)
+_BLACK_LUT = [0] + [255] * 255
+
+_threshold_cache = {}
+
+
+def _threshold_image(size):
+    """Return an "L" image of `size` holding threshold + 1 per pixel (cached per size)."""
+    image = _threshold_cache.get(size)
+    if image is None:
+        width, height = size
+        rows = [bytes(row[x % 4] + 1 for x in range(width)) for row in _THRESHOLDS]
+        image = Image.frombytes("L", size, b"".join(rows[y % 4] for y in range(height)))
+        _threshold_cache[size] = image
+    return image
+
+
+def dither_ordered(image):
+    """Return a mode "1" image of `image` with PIL polarity inverted (1 = black)."""
+    image = image.convert("L")
+    diff = ImageChops.subtract(_threshold_image(image.size), image)
+    return diff.point(_BLACK_LUT, "1")
+
+
+def pack_ordered(image, width, height):
+    """Return the packed panel buffer (bytes, 1 = black) for `image`.
+
+    Accepts `width`x`height` or rotated `height`x`width` images (rotated like
+    `EPD.getbuffer`). Raises ValueError for other sizes.
+    """
+    if image.size == (height, width):
+        image = image.rotate(90, expand=True)
+    elif image.size != (width, height):
+        raise ValueError(f"Wrong image dimensions: must be {width}x{height}")
+    return dither_ordered(image).tobytes()
+
+
+__all__ = ["dither_ordered", "pack_ordered"]
@@ -1,9 +1,9 @@
 import os
 import json
-import time
 from datetime import datetime, timezone
-import urllib.request
 import urllib.error
+import http_client
+import data_cache
 from gui_constant import colors, text_font
 from config import TIBBER_TOKEN
 
@@ -16,6 +16,14 @@ from config import TIBBER_TOKEN
 ELECTRICITY_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "electricity_cache.json")
 ELECTRICITY_SHORT_WINDOW_TTL = 300  # 5 minutes (13-15 window)
 ELECTRICITY_MAX_AGE = 86400  # 24h hard expiry; always refetch if older
+# Tibber releases day-ahead prices sometime 13:00-15:00 (system timezone, should be Europe/Stockholm on Pi)
+_cache = data_cache.DataCache(
+    "electricity",
+    data_cache.publication_window(13, 15, ELECTRICITY_SHORT_WINDOW_TTL, ELECTRICITY_MAX_AGE),
+    ELECTRICITY_CACHE_FILE,
+)
+# Error code (HTTP status or None) of the last fetch attempt
+_last_error_code = None
 
 # GraphQL query (price info + last 7 days consumption)
 TIBBER_QUERY = """
@@ -30,48 +38,6 @@ LEVEL_LABEL_SV = {
 }
 
 
-def _load_electricity_cache():
-    """Return cached data subject to dynamic time-window logic.
-
-    Between 13:00 and 15:00 (local time) enforce a short TTL (5 minutes).
-    Outside that window, if a cache file exists return its data regardless of age.
-    This matches Tibber day-ahead price publication timing (released sometime 13-15).
-    """
-    try:
-        if not os.path.exists(ELECTRICITY_CACHE_FILE):
-            return None
-        with open(ELECTRICITY_CACHE_FILE, 'r') as f:
-            cache = json.load(f)
-        data = cache.get('data')
-        if data is None:
-            return None
-
-        now_hour = time.localtime().tm_hour  # rely on system timezone (should be Europe/Stockholm on Pi)
-        cache_age = time.time() - cache.get('timestamp', 0)
-
-        # Hard age cap: if older than 24h force refresh regardless of window
-        if cache_age > ELECTRICITY_MAX_AGE:
-            return None
-
-        # Short refresh window: 13:00 <= time < 15:00
-        if 13 <= now_hour < 15:
-            if cache_age < ELECTRICITY_SHORT_WINDOW_TTL:
-                return data
-            return None  # force refetch inside the short window when stale (>5m)
-
-        # Outside publication window reuse any age (up to MAX_AGE)
-        return data
-    except Exception as e:
-        print(f"Error reading electricity cache: {e}")
-        return None
-
-def _save_electricity_cache(data):
-    try:
-        with open(ELECTRICITY_CACHE_FILE, 'w') as f:
-            json.dump({"timestamp": time.time(), "data": data}, f)
-    except Exception as e:
-        print(f"Error writing electricity cache: {e}")
-
 def _fetch_tibber_prices():
     """Return (data_dict, error_code). error_code may be HTTP status or None."""
     if not TIBBER_TOKEN:
@@ -80,14 +46,11 @@ def _fetch_tibber_prices():
     try:
         url = "https://api.tibber.com/v1-beta/gql"
         body = json.dumps({"query": TIBBER_QUERY}).encode('utf-8')
-        req = urllib.request.Request(url, data=body, method='POST')
-        req.add_header('Content-Type', 'application/json')
-        req.add_header('Authorization', f'Bearer {TIBBER_TOKEN}')
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            if resp.status != 200:
-                return None, resp.status
-            data = json.loads(resp.read().decode('utf-8'))
-            return data, None
+        headers = {'Content-Type': 'application/json', 'Authorization': f'Bearer {TIBBER_TOKEN}'}
+        resp = http_client.post(url, body, headers, timeout=10)
+        if resp.status != 200:
+            return None, resp.status
+        return resp.json(), None
     except urllib.error.HTTPError as e:
         return None, e.code
     except urllib.error.URLError as e:
@@ -97,22 +60,25 @@ def _fetch_tibber_prices():
         print(f"Unexpected electricity fetch error: {e}")
         return None, None
 
-def get_electricity_price_data():
-    """Return tuple: (prices_list, entries, highlight_idx, level_label, consumption_kwh, consumption_costs, error_code)."""
-    # Try cache
-    cached = _load_electricity_cache()
-    error_code = None
-    if cached:
-        source_data = cached
-    else:
-        fetched, error_code = _fetch_tibber_prices()
-        if fetched:
-            source_data = fetched
-            _save_electricity_cache(fetched)
-        else:
-            # If fetch failed but cache exists (already handled) else return empty
-            source_data = None
+def _fetch_for_cache():
+    global _last_error_code
+    data, _last_error_code = _fetch_tibber_prices()
+    return data or None
+
+def get_electricity_price_data(background=True):
+    """Return tuple: (prices_list, entries, highlight_idx, level_label, consumption_kwh, consumption_costs, error_code).
+
+    `background`: see `DataCache.get` (providers pass False and fetch blocking).
+    """
+    source_data = _cache.get(_fetch_for_cache, background)
+    # Error code only matters when there's nothing to show
+    return build_electricity_price_data(source_data, None if source_data else _last_error_code)
+
+def build_electricity_price_data(source_data, error_code=None, now=None):
+    """Transform a Tibber response into the tuple returned by `get_electricity_price_data()`.
 
+    `now` (aware datetime) selects the highlighted price slot; defaults to the current time.
+    """
     if not source_data:
         return [], [], -1, "", [], [], error_code
 
@@ -139,7 +105,8 @@ def get_electricity_price_data():
             })
 
         # Determine highlight index: entry whose startsAt <= now < next startsAt
-        now = datetime.now(timezone.utc)
+        if now is None:
+            now = datetime.now(timezone.utc)
         highlight_index = -1
         for i, entry in enumerate(processed):
             try:
@@ -243,9 +210,6 @@ def draw_consumption_chart(draw, pos, width, height, consumption, costs):
     # Bar geometry
     bar_width = int(chart_width / len(consumption)) - 4  # 4px gap between bars
 
-    # Title
-    draw.text((pos[0], pos[1] - 30), "Förbrukning (kWh, kr)", font=text_font, fill=colors["black"])
-
     # y labels
     y_labels = [max_consumption / 2, max_consumption]
     for i, label in enumerate(y_labels):
@@ -276,8 +240,26 @@ def draw_consumption_chart(draw, pos, width, height, consumption, costs):
         draw.text((x1 + (bar_width / 2) - 6, y2 + 5), label, font=text_font, fill=colors["dark_gray"])  # adjusted shift for shorter text
 
 
-def draw_electricity_price(draw, pos):
-    prices, entries, highlight_index, level_label, consumption_values, consumption_costs, error_code = get_electricity_price_data()
+# Chart layout relative to the section anchor
+PRICE_CHART_OFFSET = 30  # below the "Elpris" title
+PRICE_CHART_SIZE = (240, 100)
+CONSUMPTION_CHART_SIZE = (240, 80)
+CONSUMPTION_CHART_GAP = 40  # leaves room for the consumption title
+
+
+def _consumption_chart_pos(pos):
+    return (pos[0], pos[1] + PRICE_CHART_OFFSET + PRICE_CHART_SIZE[1] + CONSUMPTION_CHART_GAP)
+
+
+def draw_electricity_static(draw, pos):
+    """Draw the data-independent parts (consumption chart title) for the static layer."""
+    chart_pos = _consumption_chart_pos(pos)
+    draw.text((chart_pos[0], chart_pos[1] - 30), "Förbrukning (kWh, kr)", font=text_font, fill=colors["black"])
+
+
+def draw_electricity_price(draw, pos, data):
+    """Draw price + consumption charts; `data` is the tuple from `get_electricity_price_data()` (provider snapshot)."""
+    prices, entries, highlight_index, level_label, consumption_values, consumption_costs, error_code = data
 
     title = "Elpris"
     if level_label:
@@ -288,22 +270,15 @@ def draw_electricity_price(draw, pos):
     draw.text((pos[0], pos[1]), title, font=text_font, fill=colors["black"])
 
     # Price chart
-    price_chart_width = 240
-    price_chart_height = 100
-    price_chart_pos = (pos[0], pos[1] + 30)
+    price_chart_pos = (pos[0], pos[1] + PRICE_CHART_OFFSET)
 
-    draw_price_chart(draw, price_chart_pos, price_chart_width, price_chart_height, prices, highlight_index)
+    draw_price_chart(draw, price_chart_pos, PRICE_CHART_SIZE[0], PRICE_CHART_SIZE[1], prices, highlight_index)
 
-    # Error code (if any)
+    # Error code (if any). An error means no data, so the price chart area is empty;
+    # drawing there keeps the consumption chart (and its static title) in place.
     if error_code is not None:
         error_text = f"Fel: {error_code}"
-        draw.text((price_chart_pos[0], price_chart_pos[1] + price_chart_height + 5), error_text, font=text_font, fill=colors["black"])
-
-    # Consumption chart
-    consumption_chart_width = 240
-    consumption_chart_height = 80
-    gap = 40
-    extra_offset = 20 if error_code is not None else 0
-    consumption_chart_pos = (pos[0], pos[1] + 30 + price_chart_height + gap + extra_offset)
+        draw.text(price_chart_pos, error_text, font=text_font, fill=colors["black"])
 
-    draw_consumption_chart(draw, consumption_chart_pos, consumption_chart_width, consumption_chart_height, consumption_values, consumption_costs)
+    # Consumption chart (title lives in the static layer)
+    draw_consumption_chart(draw, _consumption_chart_pos(pos), CONSUMPTION_CHART_SIZE[0], CONSUMPTION_CHART_SIZE[1], consumption_values, consumption_costs)
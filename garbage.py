@@ -1,5 +1,6 @@
 from PIL import Image, ImageDraw, ImageFont
 from gui_constant import colors, icon_size, icon_font, text_font, text_size
+from glyph_cache import draw_text
 from datetime import datetime, timedelta
 
 # This could later be fetched from an external source
@@ -66,9 +67,10 @@ def get_reminder_message(collection, today_str):
     else:
         return f"Trädgårdsavfall: {date_str} ({days_until})"
 
-def draw_garbage_collection(draw, pos):
-    # Determine today's date string (UTC local naive)
-    today_str = datetime.now().strftime("%Y-%m-%d")
+def draw_garbage_collection(draw, pos, today_str=None):
+    # Determine today's date string (UTC local naive) unless provided by caller
+    if today_str is None:
+        today_str = datetime.now().strftime("%Y-%m-%d")
     next_collections = get_next_collection(today_str)
 
     # Calculate positions and spacing
@@ -80,11 +82,11 @@ def draw_garbage_collection(draw, pos):
     for i, collection in enumerate(next_collections):
         reminder_y = start_y + line_height * i  # Adjusted to start immediately after title
         reminder_text = get_reminder_message(collection, today_str)
-        draw.text((pos[0], reminder_y), reminder_text, font=text_font, fill=colors["black"])
+        draw_text(draw, (pos[0], reminder_y), reminder_text, font=text_font, fill=colors["black"])
 
     # Add a general instruction if next collection is soon (within 2 days)
     if next_collections and get_days_until(next_collections[0]["date"], today_str) in ["idag", "imorgon"]:
         instruction_y = start_y + line_height * len(next_collections)  # Adjusted to follow the collection items directly
         type_text = "Hushållssoporna" if next_collections[0]["type"] == "household" else "Trädgårdsavfallet"
-        draw.text((pos[0], instruction_y), f"Dags att ställa ut {type_text.lower()}!",
-                font=text_font, fill=colors["black"])
+        draw_text(draw, (pos[0], instruction_y), f"Dags att ställa ut {type_text.lower()}!",
+                  font=text_font, fill=colors["black"])
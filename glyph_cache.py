@@ -0,0 +1,64 @@
+"""Bounded LRU cache of rasterized text masks (icon glyphs and text runs).
+
+`draw_text(draw, xy, text, font, fill)` is a drop-in for `draw.text(...)` with a
+single line, default anchor and no stroke. The FreeType mask for (font, text,
+sub-pixel start) is rendered once and blitted with the fill on every later call,
+exactly like `ImageDraw.text` does internally, so output is pixel-identical.
+The fill is applied at blit time (a mask is coverage only), so one cached mask
+serves every color of the same text.
+
+Only for grayscale ("L"/"1") images, which is all this panel uses.
+"""
+import math
+import threading
+from collections import OrderedDict
+
+MAX_ENTRIES = 256  # masks are small (icons ~1-12 KB); bounds memory on the Pi Zero
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+_hits = 0
+_misses = 0
+
+
+def _get_mask(font, text, mode, start):
+    global _hits, _misses
+    key = (font, text, mode, start)
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None:
+            _cache.move_to_end(key)
+            _hits += 1
+            return entry
+        _misses += 1
+    entry = font.getmask2(text, mode, start=start)
+    with _lock:
+        _cache[key] = entry
+        if len(_cache) > MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return entry
+
+
+def draw_text(draw, xy, text, font, fill):
+    """Draw `text` at `xy` like `draw.text(xy, text, font=font, fill=fill)`, reusing cached masks."""
+    x, y = xy
+    start = (math.modf(x)[0], math.modf(y)[0])
+    mask, offset = _get_mask(font, text, draw.fontmode, start)
+    draw.draw.draw_bitmap((int(x) + offset[0], int(y) + offset[1]), mask, fill)
+
+
+def cache_stats():
+    """Return {"hits", "misses", "size"} counters since start (or last clear)."""
+    with _lock:
+        return {"hits": _hits, "misses": _misses, "size": len(_cache)}
+
+
+def clear_cache():
+    global _hits, _misses
+    with _lock:
+        _cache.clear()
+        _hits = 0
+        _misses = 0
+
+
+__all__ = ["draw_text", "cache_stats", "clear_cache", "MAX_ENTRIES"]
@@ -9,9 +9,11 @@ colors = {
 # Fonts
 icon_size = 36
 big_icon_size = icon_size * 3
+small_icon_size = 20
 text_size = 16
 headline_text_size = icon_size * 2
 icon_font = ImageFont.truetype("fonts/1.woff", icon_size)
 big_icon_font = ImageFont.truetype("fonts/1.woff", big_icon_size)
+small_icon_font = ImageFont.truetype("fonts/1.woff", small_icon_size)
 text_font = ImageFont.truetype("fonts/noto-sans-regular.ttf", text_size)
 headline_text_font = ImageFont.truetype("fonts/noto-sans-regular.ttf", headline_text_size)
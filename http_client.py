@@ -0,0 +1,282 @@
+"""Small stdlib HTTP client for the remote sources (weather, Tibber, dishes).
+
+`urllib.request.urlopen` opens a fresh TCP + TLS connection per call, loads the
+CA store again and asks the resolver every time; on the Pi Zero the handshake
+alone is a noticeable chunk of CPU. This module keeps, per process:
+
+- idle keep-alive connections per (scheme, host, port), reused while younger
+  than `IDLE_TIMEOUT` (a dead reused connection is retried once on a new one),
+- one shared SSL context, and the last TLS session per host so new
+  connections resume instead of doing a full handshake,
+- resolved addresses per host for `DNS_TTL` seconds (urllib's timeout doesn't
+  cover DNS, so a slow resolver used to stall every fetch),
+- the ETag / Last-Modified validators and body of conditional GETs: the next
+  request sends If-None-Match / If-Modified-Since and a 304 reuses the body.
+
+Redirects (301/302/303/307/308) are followed for up to `MAX_REDIRECTS` hops, as
+urlopen did.
+
+Responses are requested with `Accept-Encoding: gzip` and decoded here. Errors
+are raised as `urllib.error.HTTPError` (status >= 400) and `urllib.error.URLError`
+(connection/timeout), so callers keep their urllib error handling.
+
+    from http_client import get, post
+    data = get(url, timeout=10, conditional=True).json()
+
+Proxies (`HTTPS_PROXY`) are not supported; the panel talks to the APIs directly.
+"""
+import gzip
+import http.client
+import json
+import socket
+import ssl
+import threading
+import time
+import urllib.error
+from collections import Counter
+from typing import Dict, NamedTuple, Optional
+from urllib.parse import urljoin, urlsplit
+
+import tracing
+
+IDLE_TIMEOUT = 30  # s; below common server keep-alive limits, so pooled sockets are rarely dead
+DNS_TTL = 300  # s
+USER_AGENT = "eink-control-panel"
+MAX_REDIRECTS = 5
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+_lock = threading.Lock()
+# (scheme, host, port) -> [(connection, idle since)]
+_idle = {}
+# host -> (expires at, [getaddrinfo results])
+_dns = {}
+# host -> ssl.SSLSession of the last connection
+_sessions = {}
+# url -> (etag, last_modified, body)
+_validators = {}
+_ssl_context = None
+# requests, connections, reused, retries, redirects, dns_hits, dns_lookups, not_modified, gzip, bytes_in
+stats = Counter()
+
+
+class Response(NamedTuple):
+    status: int
+    headers: Dict[str, str]  # lower-case names
+    body: bytes  # decoded (gunzipped); the cached body on a 304
+    not_modified: bool = False
+
+    def json(self):
+        return json.loads(self.body.decode("utf-8"))
+
+
+def _context():
+    global _ssl_context
+    if _ssl_context is None:
+        _ssl_context = ssl.create_default_context()
+    return _ssl_context
+
+
+def _resolve(host, port):
+    now = time.monotonic()
+    with _lock:
+        entry = _dns.get(host)
+    if entry is not None and entry[0] > now:
+        stats["dns_hits"] += 1
+        return entry[1]
+    stats["dns_lookups"] += 1
+    infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    with _lock:
+        _dns[host] = (now + DNS_TTL, infos)
+    return infos
+
+
+def _create_connection(address, timeout=None, source_address=None, *args):
+    """socket.create_connection() against the cached addresses of `address`."""
+    host, port = address
+    error = None
+    for family, type_, proto, _, sockaddr in _resolve(host, port):
+        sock = socket.socket(family, type_, proto)
+        try:
+            if timeout is not None and timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                sock.settimeout(timeout)
+            if source_address:
+                sock.bind(source_address)
+            sock.connect(sockaddr)
+            return sock
+        except OSError as e:
+            error = e
+            sock.close()
+    # Every cached address failed: the host may have moved, resolve again next time
+    with _lock:
+        _dns.pop(host, None)
+    raise error or OSError(f"no addresses for {host}")
+
+
+class _HTTPConnection(http.client.HTTPConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _create_connection
+
+
+class _HTTPSConnection(http.client.HTTPSConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, context=_context(), **kwargs)
+        self._create_connection = _create_connection
+
+    def connect(self):
+        http.client.HTTPConnection.connect(self)
+        self.sock = self._context.wrap_socket(self.sock, server_hostname=self.host,
+                                              session=_sessions.get(self.host))
+
+
+def _acquire(key, timeout):
+    """Return (connection, reused) for `key`: a pooled idle one or a new one."""
+    now = time.monotonic()
+    with _lock:
+        pool = _idle.get(key, [])
+        while pool:
+            conn, since = pool.pop()
+            if now - since < IDLE_TIMEOUT:
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+            conn.close()
+    scheme, host, port = key
+    cls = _HTTPSConnection if scheme == "https" else _HTTPConnection
+    stats["connections"] += 1
+    return cls(host, port, timeout=timeout), False
+
+
+def _release(key, conn, response):
+    if response.will_close:
+        conn.close()
+        return
+    if isinstance(conn.sock, ssl.SSLSocket) and conn.sock.session is not None:
+        _sessions[conn.host] = conn.sock.session
+    with _lock:
+        _idle.setdefault(key, []).append((conn, time.monotonic()))
+
+
+def _exchange(key, method, target, body, headers, timeout):
+    """Send one request, retrying once on a new connection if a pooled one was dead."""
+    while True:
+        conn, reused = _acquire(key, timeout)
+        try:
+            conn.request(method, target, body=body, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            conn.close()
+            if not reused:
+                raise
+            # The server dropped the idle connection between requests
+            stats["retries"] += 1
+            continue
+        except BaseException:
+            conn.close()
+            raise
+        stats["reused"] += reused
+        _release(key, conn, response)
+        return response, data
+
+
+def _send(method, url, body, headers, timeout):
+    """Send one request to `url`; return (response, body bytes, lower-case headers)."""
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https") or not parts.hostname:
+        raise urllib.error.URLError(f"unsupported URL {url!r}")
+    port = parts.port or (443 if scheme == "https" else 80)
+    key = (scheme, parts.hostname, port)
+    target = parts.path or "/"
+    if parts.query:
+        target += "?" + parts.query
+
+    stats["requests"] += 1
+    try:
+        with tracing.span(f"http.{parts.hostname}", "http"):
+            response, data = _exchange(key, method, target, body, headers, timeout)
+    except (OSError, http.client.HTTPException) as e:
+        raise urllib.error.URLError(e) from e
+    stats["bytes_in"] += len(data)
+    return response, data, {name.lower(): value for name, value in response.getheaders()}
+
+
+def request(method: str, url: str, body: Optional[bytes] = None, headers: Optional[Dict[str, str]] = None,
+            timeout: float = 10, conditional: bool = False) -> Response:
+    """Perform one HTTP request and return its `Response` (see module docstring).
+
+    Redirects are followed like urlopen does, up to `MAX_REDIRECTS` hops: 301/302/303
+    continue as a GET without body, 307/308 repeat the method and body. Relative
+    locations resolve against the redirecting URL; the Authorization header is
+    not sent to another host.
+
+    `conditional` (GET only) revalidates the last body of `url` with its ETag /
+    Last-Modified; a 304 returns that body with `not_modified=True`.
+    """
+    send = {"Accept-Encoding": "gzip", "User-Agent": USER_AGENT}
+    send.update(headers or {})
+    cached = _validators.get(url) if conditional else None
+    if cached is not None:
+        etag, last_modified, _ = cached
+        if etag:
+            send["If-None-Match"] = etag
+        if last_modified:
+            send["If-Modified-Since"] = last_modified
+
+    location = url
+    for hop in range(MAX_REDIRECTS + 1):
+        response, data, response_headers = _send(method, location, body, send, timeout)
+        if response.status not in REDIRECT_CODES:
+            break
+        target = response_headers.get("location")
+        if not target or hop == MAX_REDIRECTS:
+            reason = "redirect without Location" if not target else f"more than {MAX_REDIRECTS} redirects"
+            raise urllib.error.HTTPError(location, response.status, reason, response.msg, None)
+        stats["redirects"] += 1
+        target = urljoin(location, target)
+        if response.status in (301, 302, 303) and method != "HEAD":
+            method, body = "GET", None
+            send = {k: v for k, v in send.items() if k.lower() not in ("content-type", "content-length")}
+        if urlsplit(target).hostname != urlsplit(location).hostname:
+            send = {k: v for k, v in send.items() if k.lower() != "authorization"}
+        location = target
+
+    if response.status == 304:
+        if cached is None:
+            raise urllib.error.HTTPError(location, 304, "Not Modified without a cached body", response.msg, None)
+        stats["not_modified"] += 1
+        return Response(200, response_headers, cached[2], True)
+    if response.status >= 400:
+        raise urllib.error.HTTPError(location, response.status, response.reason, response.msg, None)
+    if response_headers.get("content-encoding", "").lower() == "gzip":
+        stats["gzip"] += 1
+        data = gzip.decompress(data)
+    if conditional and response.status == 200:
+        etag, last_modified = response_headers.get("etag"), response_headers.get("last-modified")
+        if etag or last_modified:
+            _validators[url] = (etag, last_modified, data)
+    return Response(response.status, response_headers, data)
+
+
+def get(url: str, headers: Optional[Dict[str, str]] = None, timeout: float = 10,
+        conditional: bool = False) -> Response:
+    return request("GET", url, headers=headers, timeout=timeout, conditional=conditional)
+
+
+def post(url: str, body: bytes, headers: Optional[Dict[str, str]] = None, timeout: float = 10) -> Response:
+    return request("POST", url, body=body, headers=headers, timeout=timeout)
+
+
+def close_all():
+    """Close every pooled connection (e.g. before a long sleep)."""
+    with _lock:
+        pools = list(_idle.values())
+        _idle.clear()
+    for pool in pools:
+        for conn, _ in pool:
+            conn.close()
+
+
+__all__ = ["Response", "request", "get", "post", "close_all", "stats", "IDLE_TIMEOUT", "DNS_TTL", "MAX_REDIRECTS"]
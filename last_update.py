@@ -13,6 +13,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional
 from gui_constant import colors, text_font
+from text_metrics import text_bbox
 
 _DEF_FORMAT = "%H:%M:%S"
 
@@ -30,7 +31,7 @@ def draw_last_update(draw, pos, dt: Optional[datetime] = None):
 
     # Swedish label prefix
     label = f"{dt.strftime(_DEF_FORMAT)}"
-    bbox = draw.textbbox((0, 0), label, font=text_font)
+    bbox = text_bbox(label, text_font)
     text_w = bbox[2] - bbox[0]
     text_h = bbox[3] - bbox[1]
 
@@ -29,7 +29,10 @@
 
 
 import logging
+from PIL import Image
 from . import epdconfig
+from . import packing
+from . import stream
 
 # Display resolution
 EPD_WIDTH       = 960
@@ -122,9 +125,37 @@ class EPD:
     def send_data2(self, data):
         epdconfig.digital_write(self.dc_pin, 1)
         epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.SPI.writebytes2(data)
+        epdconfig.spi_writebyte2(data)
         epdconfig.digital_write(self.cs_pin, 1)
 
+    # Data phase fed from an iterable of chunks (see stream.py)
+    def send_frame(self, chunks):
+        epdconfig.digital_write(self.dc_pin, 1)
+        epdconfig.digital_write(self.cs_pin, 0)
+        for chunk in chunks:
+            epdconfig.spi_writebyte2(chunk)
+        epdconfig.digital_write(self.cs_pin, 1)
+
+    # image: PIL image (packed band by band) or a packed buffer as from getbuffer()
+    # (list, bytes, memoryview, mmap). Returns a function yielding the frame's
+    # chunks, called once per RAM plane written.
+    def frame_source(self, image):
+        if isinstance(image, Image.Image):
+            img = packing.mono_image(image, self.width, self.height)
+            if img is None:
+                return lambda: stream.fill_chunks(0xFF, self.width // 8 * self.height)
+            return lambda: stream.image_chunks(img)
+        return lambda: stream.buffer_chunks(image)
+
+    # Same for 4-gray frames: PIL image or a 2-bit buffer from getbuffer_4Gray()
+    def gray4_source(self, image):
+        if isinstance(image, Image.Image):
+            img = packing.gray4_image(image, self.width, self.height)
+            if img is None:
+                return lambda: stream.fill_chunks(0xFF, int(self.width / 4) * self.height)
+            return lambda: stream.gray4_chunks(img)
+        return lambda: stream.buffer_chunks(image)
+
     def ReadBusy(self):
         logger.debug("e-Paper busy")
         busy = epdconfig.digital_read(self.busy_pin)
@@ -303,84 +334,33 @@ class EPD:
 
 
     def getbuffer(self, image):
-        # logger.debug("bufsiz = ",int(self.width/8) * self.height)
-        buf = [0xFF] * (int(self.width / 8) * self.height)
-        image_monocolor = image.convert('1')
-        imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
-        # logger.debug("imwidth = %d, imheight = %d",imwidth,imheight)
-        if imwidth == self.width and imheight == self.height:
-            logger.debug("Horizontal")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    # Set the bits for the column of pixels at the current position.
-                    if pixels[x, y] == 0:
-                        buf[int((x + y * self.width) / 8)] &= ~(0x80 >> (x % 8))
-        elif imwidth == self.height and imheight == self.width:
-            logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    newx = y
-                    newy = self.height - x - 1
-                    if pixels[x, y] == 0:
-                        buf[int((newx + newy * self.width) / 8)] &= ~(0x80 >> (y % 8))
-        return buf
+        return packing.pack_mono(image, self.width, self.height)
 
     def getbuffer_4Gray(self, image):
-        # logger.debug("bufsiz = ",int(self.width/8) * self.height)
-        buf = [0xFF] * (int(self.width / 4) * self.height)
-        image_monocolor = image.convert('L')
-        imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
-        i=0
-        # logger.debug("imwidth = %d, imheight = %d",imwidth,imheight)
-        if(imwidth == self.width and imheight == self.height):
-            logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    # Set the bits for the column of pixels at the current position.
-                    if(pixels[x, y] == 0xC0):
-                        pixels[x, y] = 0x80
-                    elif (pixels[x, y] == 0x80):
-                        pixels[x, y] = 0x40
-                    i= i+1
-                    if(i%4 == 0):
-                        buf[int((x + (y * self.width))/4)] = ((pixels[x-3, y]&0xc0) | (pixels[x-2, y]&0xc0)>>2 | (pixels[x-1, y]&0xc0)>>4 | (pixels[x, y]&0xc0)>>6)
-                        
-        elif(imwidth == self.height and imheight == self.width):
-            logger.debug("Horizontal")
-            for x in range(imwidth):
-                for y in range(imheight):
-                    newx = y
-                    newy = self.height - x - 1
-                    if(pixels[x, y] == 0xC0):
-                        pixels[x, y] = 0x80
-                    elif (pixels[x, y] == 0x80):
-                        pixels[x, y] = 0x40
-                    i= i+1
-                    if(i%4 == 0):
-                        buf[int((newx + (newy * self.width))/4)] = ((pixels[x, y-3]&0xc0) | (pixels[x, y-2]&0xc0)>>2 | (pixels[x, y-1]&0xc0)>>4 | (pixels[x, y]&0xc0)>>6) 
-        return buf
+        img = packing.gray4_image(image, self.width, self.height)
+        if img is None:
+            return [0xFF] * (int(self.width / 4) * self.height)
+        return packing.pack_levels(img, packing.GRAY4_LUT, 2)
 
     def Clear(self):
-        buf = [0xFF] * (int(self.width/8) * self.height)
         self.send_command(0x24)
-        self.send_data2(buf)
+        self.send_frame(stream.fill_chunks(0xFF, int(self.width/8) * self.height))
 
         self.TurnOnDisplay()
     
     def display(self, image):
         self.send_command(0x24)
-        self.send_data2(image)
+        self.send_frame(self.frame_source(image)())
 
         self.TurnOnDisplay()
 
     def display_Base(self, image):
+        source = self.frame_source(image)
         self.send_command(0x24)
-        self.send_data2(image)
+        self.send_frame(source())
 
         self.send_command(0x26)
-        self.send_data2(image)
+        self.send_frame(source())
 
         self.TurnOnDisplay()
 
@@ -391,14 +371,10 @@ class EPD:
             Width = self.width // 8 +1
         Height = self.height
         self.send_command(0x24)   #Write Black and White image to RAM
-        for j in range(Height):
-            for i in range(Width):
-                self.send_data(color)
+        self.send_frame(stream.fill_chunks(color, Width * Height))
                 
         self.send_command(0x26)  #Write Black and White image to RAM
-        for j in range(Height):
-            for i in range(Width):
-                self.send_data(color)
+        self.send_frame(stream.fill_chunks(color, Width * Height))
         # self.TurnOnDisplay()
 
     def display_Partial(self, Image, Xstart, Ystart, Xend, Yend):
@@ -440,77 +416,17 @@ class EPD:
         self.send_data((Ystart>>8) & 0x01)
 
         self.send_command(0x24)  
-        for j in range(Height):
-            for i in range(Width):
-                if((j > Ystart-1) & (j < (Yend + 1)) & (i > Xstart-1) & (i < (Xend + 1))):
-                    self.send_data(Image[i + j * Width])
+        # Window rows Ystart..Yend, bytes Xstart..Xend of each
+        self.send_frame(Image[j * Width + Xstart:j * Width + Xend + 1] for j in range(Ystart, Yend + 1))
         self.TurnOnDisplay_Part()
     
     def display_4Gray(self, image):
+        source = self.gray4_source(image)
         self.send_command(0x24)
-        for i in range(0, 81600): 
-            temp3=0
-            for j in range(0, 2):
-                temp1 = image[i*2+j]
-                for k in range(0, 2):
-                    temp2 = temp1&0xC0 
-                    if(temp2 == 0xC0):
-                        temp3 |= 0x00
-                    elif(temp2 == 0x00):
-                        temp3 |= 0x01  
-                    elif(temp2 == 0x80): 
-                        temp3 |= 0x01 
-                    else: #0x40
-                        temp3 |= 0x00 
-                    temp3 <<= 1	
-                    
-                    temp1 <<= 2
-                    temp2 = temp1&0xC0 
-                    if(temp2 == 0xC0): 
-                        temp3 |= 0x00
-                    elif(temp2 == 0x00): 
-                        temp3 |= 0x01
-                    elif(temp2 == 0x80):
-                        temp3 |= 0x01
-                    else :   #0x40
-                        temp3 |= 0x00	
-                    if(j!=1 or k!=1):				
-                        temp3 <<= 1
-                    temp1 <<= 2
-            self.send_data(temp3)
-            
-        self.send_command(0x26)	       
-        for i in range(0, 81600): 
-            temp3=0
-            for j in range(0, 2):
-                temp1 = image[i*2+j]
-                for k in range(0, 2):
-                    temp2 = temp1&0xC0 
-                    if(temp2 == 0xC0):
-                        temp3 |= 0x00
-                    elif(temp2 == 0x00):
-                        temp3 |= 0x01
-                    elif(temp2 == 0x80):
-                        temp3 |= 0x00
-                    else: #0x40
-                        temp3 |= 0x01 
-                    temp3 <<= 1	
-                    
-                    temp1 <<= 2
-                    temp2 = temp1&0xC0 
-                    if(temp2 == 0xC0): 
-                        temp3 |= 0x00
-                    elif(temp2 == 0x00): 
-                        temp3 |= 0x01
-                    elif(temp2 == 0x80):
-                        temp3 |= 0x00 
-                    else:    #0x40
-                            temp3 |= 0x01	
-                    if(j!=1 or k!=1):					
-                        temp3 <<= 1
-                    temp1 <<= 2
-            self.send_data(temp3)
-        
+        self.send_frame(packing.gray4_plane(chunk, 0) for chunk in source())
+        self.send_command(0x26)
+        self.send_frame(packing.gray4_plane(chunk, 1) for chunk in source())
+
         self.TurnOnDisplay_4GRAY()
 
 
@@ -30,6 +30,8 @@
 
 import logging
 from . import epdconfig
+from . import packing
+from PIL import Image
 
 # Display resolution
 EPD_WIDTH       = 122
@@ -219,33 +221,17 @@ class EPD:
         return 0
 
     def getbuffer(self, image):
-        if self.width%8 == 0:
-            linewidth = int(self.width/8)
+        # This panel's RAM is mirrored: column x is sent as bit (width - x) of its row
+        img = image.convert('1')
+        if img.size == (self.width, self.height):
+            mirrored = Image.new('1', (self.width + 1, self.height), 1)
+            mirrored.paste(img.transpose(Image.FLIP_LEFT_RIGHT), (1, 0))
+            img = mirrored
+        elif img.size == (self.height, self.width):
+            img = img.transpose(Image.TRANSPOSE)
         else:
-            linewidth = int(self.width/8) + 1
-         
-        buf = [0xFF] * (linewidth * self.height)
-        image_monocolor = image.convert('1')
-        imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
-        
-        if(imwidth == self.width and imheight == self.height):
-            logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):                    
-                    if pixels[x, y] == 0:
-                        x = imwidth - x
-                        buf[int(x / 8) + y * linewidth] &= ~(0x80 >> (x % 8))
-        elif(imwidth == self.height and imheight == self.width):
-            logger.debug("Horizontal")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    newx = y
-                    newy = self.height - x - 1
-                    if pixels[x, y] == 0:
-                        newy = imwidth - newy - 1
-                        buf[int(newx / 8) + newy*linewidth] &= ~(0x80 >> (y % 8))
-        return buf   
+            return [0xFF] * ((self.width + 7) // 8 * self.height)
+        return list(packing.pad_rows(img).tobytes('raw'))
         
         
     def display(self, image):
@@ -30,15 +30,15 @@
 
 import logging
 from . import epdconfig
-
-import PIL
-from PIL import Image
-import io
+from . import packing
 
 # Display resolution
 EPD_WIDTH       = 184
 EPD_HEIGHT      = 360
 
+# Panel colours in index order: black, white, yellow, red
+PALETTE = (0,0,0,  255,255,255,  255,255,0,   255,0,0)
+
 logger = logging.getLogger(__name__)
 
 class EPD:
@@ -159,31 +159,7 @@ class EPD:
         return 0
 
     def getbuffer(self, image):
-        # Create a pallette with the 4 colors supported by the panel
-        pal_image = Image.new("P", (1,1))
-        pal_image.putpalette( (0,0,0,  255,255,255,  255,255,0,   255,0,0) + (0,0,0)*252)
-
-        # Check if we need to rotate the image
-        imwidth, imheight = image.size
-        if(imwidth == self.width and imheight == self.height):
-            image_temp = image
-        elif(imwidth == self.height and imheight == self.width):
-            image_temp = image.rotate(90, expand=True)
-        else:
-            logger.warning("Invalid image dimensions: %d x %d, expected %d x %d" % (imwidth, imheight, self.width, self.height))
-
-        # Convert the soruce image to the 4 colors, dithering if needed
-        image_4color = image_temp.convert("RGB").quantize(palette=pal_image)
-        buf_4color = bytearray(image_4color.tobytes('raw'))
-
-        # into a single byte to transfer to the panel
-        buf = [0x00] * int(self.width * self.height / 4)
-        idx = 0
-        for i in range(0, len(buf_4color), 4):
-            buf[idx] = (buf_4color[i] << 6) + (buf_4color[i+1] << 4) + (buf_4color[i+2] << 2) + buf_4color[i+3]
-            idx += 1
-
-        return buf
+        return packing.pack_palette(image, self.width, self.height, PALETTE, blank=0x55, bits=2)
 
     def display(self, image):
         if self.width % 4 == 0 :
@@ -31,15 +31,16 @@
 
 import logging
 from . import epdconfig
+from . import packing
 
-import PIL
-from PIL import Image
-import io
 
 # Display resolution
 EPD_WIDTH       = 600
 EPD_HEIGHT      = 448
 
+# Panel colours in index order: black, white, green, blue, red, yellow, orange
+PALETTE = (0,0,0,  255,255,255,  0,255,0,   0,0,255,  255,0,0,  255,255,0, 255,128,0)
+
 logger = logging.getLogger(__name__)
 
 class EPD:
@@ -143,32 +144,7 @@ class EPD:
         return 0
 
     def getbuffer(self, image):
-        # Create a pallette with the 7 colors supported by the panel
-        pal_image = Image.new("P", (1,1))
-        pal_image.putpalette( (0,0,0,  255,255,255,  0,255,0,   0,0,255,  255,0,0,  255,255,0, 255,128,0) + (0,0,0)*249)
-
-        # Check if we need to rotate the image
-        imwidth, imheight = image.size
-        if(imwidth == self.width and imheight == self.height):
-            image_temp = image
-        elif(imwidth == self.height and imheight == self.width):
-            image_temp = image.rotate(90, expand=True)
-        else:
-            logger.warning("Invalid image dimensions: %d x %d, expected %d x %d" % (imwidth, imheight, self.width, self.height))
-
-        # Convert the soruce image to the 7 colors, dithering if needed
-        image_7color = image_temp.convert("RGB").quantize(palette=pal_image)
-        buf_7color = bytearray(image_7color.tobytes('raw'))
-
-        # PIL does not support 4 bit color, so pack the 4 bits of color
-        # into a single byte to transfer to the panel
-        buf = [0x00] * int(self.width * self.height / 2)
-        idx = 0
-        for i in range(0, len(buf_7color), 2):
-            buf[idx] = (buf_7color[i] << 4) + buf_7color[i+1]
-            idx += 1
-
-        return buf
+        return packing.pack_palette(image, self.width, self.height, PALETTE)
 
     def display(self,image):
         self.send_command(0x61) #Set Resolution setting
@@ -196,8 +172,7 @@ class EPD:
         self.send_command(0x10)
 
         # Set all pixels to white
-        buf = [0x11] * int(self.width * self.height / 2)
-        self.send_data2(buf)
+        self.send_data2(b'\x11' * (self.width * self.height // 2))
 
         self.send_command(0x04) #0x04
         self.ReadBusyHigh()
@@ -30,6 +30,7 @@
 
 import logging
 from . import epdconfig
+from . import packing
 
 # Display resolution
 EPD_WIDTH       = 640
@@ -127,36 +128,16 @@ class EPD:
     def getbuffer(self, image):
         img = image
         imwidth, imheight = img.size
-        halfwidth = int(self.width / 2)
-        buf = [0x33] * halfwidth * self.height
-        
         if(imwidth == self.width and imheight == self.height):
             img = img.convert('1')
         elif(imwidth == self.height and imheight == self.width):
             img = img.rotate(90, expand=True).convert('1')
-            imwidth, imheight = img.size
         else:
             logger.warning("Wrong image dimensions: must be " + str(self.width) + "x" + str(self.height))
             # return a blank buffer
-            return buf
-        
-        pixels = img.load()
-
-        for y in range(imheight):
-            offset = y * halfwidth
-            for x in range(1, imwidth, 2):
-                i = offset + x // 2
-                if(pixels[x-1, y] > 191):
-                    if(pixels[x, y] > 191):
-                        buf[i] = 0x33
-                    else:
-                        buf[i] = 0x30
-                else:
-                    if(pixels[x, y] > 191):
-                        buf[i] = 0x03
-                    else:
-                        buf[i] = 0x00
-        return buf
+            return [0x33] * int(self.width / 2) * self.height
+        # 4 bits per pixel: white -> 0x3, black -> 0x0
+        return packing.pack_levels(img, [0x0] * 192 + [0x3] * 64, 4)
         
     def display(self, image):
         self.send_command(0x10)
@@ -29,7 +29,10 @@
 
 
 import logging
+from PIL import Image
 from . import epdconfig
+from . import packing
+from . import stream
 
 # Display resolution
 EPD_WIDTH       = 880
@@ -72,6 +75,24 @@ class EPD:
         epdconfig.digital_write(self.cs_pin, 0)
         epdconfig.spi_writebyte2(data)
         epdconfig.digital_write(self.cs_pin, 1)
+
+    # Data phase fed from an iterable of chunks (see stream.py)
+    def send_frame(self, chunks):
+        epdconfig.digital_write(self.dc_pin, 1)
+        epdconfig.digital_write(self.cs_pin, 0)
+        for chunk in chunks:
+            epdconfig.spi_writebyte2(chunk)
+        epdconfig.digital_write(self.cs_pin, 1)
+
+    # image: PIL image (packed band by band) or a packed buffer as from getbuffer()
+    # (list, bytes, memoryview, mmap); yields the frame's chunks
+    def frame_chunks(self, image):
+        if isinstance(image, Image.Image):
+            img = packing.raw_image(image, self.width, self.height)
+            if img is None:
+                return stream.fill_chunks(0xFF, int(self.width / 8) * self.height)
+            return stream.image_chunks(img)
+        return stream.buffer_chunks(image)
         
     def ReadBusy(self):
         logger.debug("e-Paper busy")
@@ -131,25 +152,13 @@ class EPD:
         return 0
 
     def getbuffer(self, image):
-        img = image
-        imwidth, imheight = img.size
-        if(imwidth == self.width and imheight == self.height):
-            img = img.convert('1')
-        elif(imwidth == self.height and imheight == self.width):
-            img = img.rotate(90, expand=True).convert('1')
-        else:
-            logger.warning("Wrong image dimensions: must be " + str(self.width) + "x" + str(self.height))
-            # return a blank buffer
-            return [0xff] * int(self.width * self.height / 8)
-
-        buf = bytearray(img.tobytes('raw'))
-        return buf
+        return packing.pack_raw(image, self.width, self.height, blank=0xff)
         
     def display(self, image):
         self.send_command(0x4F) 
         self.send_data2([0x00, 0x00])
         self.send_command(0x24)
-        self.send_data2(image)
+        self.send_frame(self.frame_chunks(image))
         self.send_command(0x22)
         self.send_data(0xF7)#Load LUT from MCU(0x32)
         self.send_command(0x20)
@@ -157,14 +166,14 @@ class EPD:
         self.ReadBusy()
         
     def Clear(self):
-        buf = [0xff] * int(self.width * self.height / 8)
+        size = int(self.width * self.height / 8)
         self.send_command(0x4F) 
         self.send_data2([0x00, 0x00])
         self.send_command(0x24)
-        self.send_data2(buf)
+        self.send_frame(stream.fill_chunks(0xFF, size))
             
         self.send_command(0x26)
-        self.send_data2(buf)
+        self.send_frame(stream.fill_chunks(0xFF, size))
                 
         self.send_command(0x22)
         self.send_data(0xF7)#Load LUT from MCU(0x32)
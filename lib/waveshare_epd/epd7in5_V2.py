@@ -29,7 +29,10 @@
 
 
 import logging
+import time
 from . import epdconfig
+from . import packing
+from .transport import operation
 
 # Display resolution
 EPD_WIDTH       = 800
@@ -42,8 +45,60 @@ GRAY4  = 0x00 #Blackest
 
 logger = logging.getLogger(__name__)
 
+BUSY_TIMEOUT = 30   # s; a full refresh takes ~4 s, give up (with a warning) after this
+BUSY_POLL_MS = 10   # poll interval on platforms without GPIO edge events
+
+# Command sequences, precompiled: (command, payload bytes) pairs, each sent as
+# one SPI transaction. An int entry means: wait that many ms, then ReadBusy().
+POWER_ON = ((0x04, b''), 100)
+
+INIT_FULL = (
+    (0x06, b'\x17\x17\x28\x17'),     # btst (if an exception is displayed, try 0x38 as 3rd byte)
+    (0x01, b'\x07\x07\x28\x17'),     # POWER SETTING: VGH=20V,VGL=-20V, VDH=15V, VDL=-15V
+) + POWER_ON + (
+    (0x00, b'\x1F'),                 # PANNEL SETTING: KW-3f KWR-2F BWROTP 0f BWOTP 1f
+    (0x61, b'\x03\x20\x01\xE0'),     # tres: source 800, gate 480
+    (0x15, b'\x00'),
+    (0x50, b'\x10\x07'),             # if the screen appears gray: 0x10 0x17 and (0x52, 0x03)
+    (0x60, b'\x22'),                 # TCON SETTING
+)
+
+INIT_FAST = (
+    (0x00, b'\x1F'),                 # PANNEL SETTING
+    (0x50, b'\x10\x07'),             # if the screen appears gray: 0x10 0x17 and (0x52, 0x03)
+) + POWER_ON + (
+    (0x06, b'\x27\x27\x18\x17'),     # Booster Soft Start (enhanced display drive)
+    (0xE0, b'\x02'),
+    (0xE5, b'\x5A'),
+)
+
+INIT_PART = (
+    (0x00, b'\x1F'),                 # PANNEL SETTING
+) + POWER_ON + (
+    (0xE0, b'\x02'),
+    (0xE5, b'\x6E'),
+)
+
+INIT_4GRAY = (
+    (0x00, b'\x1F'),                 # PANNEL SETTING
+    (0x50, b'\x10\x07'),
+) + POWER_ON + (
+    (0x06, b'\x27\x27\x18\x17'),     # Booster Soft Start (enhanced display drive)
+    (0xE0, b'\x02'),
+    (0xE5, b'\x5F'),
+)
+
+SLEEP = (
+    (0x50, b'\xF7'),
+    (0x02, b''),                      # POWER_OFF
+    0,
+    (0x07, b'\xA5'),                 # DEEP_SLEEP
+)
+
+REFRESH = ((0x12, b''), 100)          # DISPLAY_REFRESH, then wait for the waveform
+
 class EPD:
-    def __init__(self):
+    def __init__(self, busy_timeout=BUSY_TIMEOUT):
         self.reset_pin = epdconfig.RST_PIN
         self.dc_pin = epdconfig.DC_PIN
         self.busy_pin = epdconfig.BUSY_PIN
@@ -54,6 +109,15 @@ class EPD:
         self.GRAY2  = GRAY2
         self.GRAY3  = GRAY3 #gray
         self.GRAY4  = GRAY4 #Blackest
+        self.busy_timeout = busy_timeout
+        # Duration of the last ReadBusy() wait and of all of them (ms)
+        self.last_busy_ms = 0.0
+        self.busy_ms_total = 0.0
+        # Per-operation transport counters and timings, see transport.py
+        self.transport_stats = {}
+        # Constant Clear() planes, allocated once
+        self._clear_old = b'\xff' * (EPD_WIDTH // 8 * EPD_HEIGHT)
+        self._clear_new = bytes(EPD_WIDTH // 8 * EPD_HEIGHT)
     
     # Hardware reset
     def reset(self):
@@ -79,247 +143,113 @@ class EPD:
     def send_data2(self, data):
         epdconfig.digital_write(self.dc_pin, 1)
         epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.SPI.writebytes2(data)
+        epdconfig.spi_writebyte2(data)
         epdconfig.digital_write(self.cs_pin, 1)
 
+    def send_command_data(self, command, data=None):
+        epdconfig.spi_write_command(command, data)
+
+    def run_sequence(self, sequence):
+        for step in sequence:
+            if isinstance(step, int):
+                if step:
+                    epdconfig.delay_ms(step)
+                self.ReadBusy()
+            else:
+                self.send_command_data(*step)
+
+    # BUSY is low while the panel works. Sleeps on a GPIO edge where the platform
+    # supports it (no CPU used during the waveform), otherwise polls with a sleep.
     def ReadBusy(self):
         logger.debug("e-Paper busy")
+        start = time.monotonic()
         self.send_command(0x71)
-        busy = epdconfig.digital_read(self.busy_pin)
-        while(busy == 0):
-            self.send_command(0x71)
-            busy = epdconfig.digital_read(self.busy_pin)
+        wait_for_pin = getattr(epdconfig, 'wait_for_pin', None)
+        if wait_for_pin is not None:
+            released = wait_for_pin(self.busy_pin, 1, self.busy_timeout)
+        else:
+            released = self._poll_busy(start)
+        self.last_busy_ms = (time.monotonic() - start) * 1000
+        self.busy_ms_total += self.last_busy_ms
+        if not released:
+            logger.warning("e-Paper busy timeout after %.1fs", self.busy_timeout)
         epdconfig.delay_ms(20)
-        logger.debug("e-Paper busy release")
+        logger.debug("e-Paper busy release (%.0f ms)", self.last_busy_ms)
+
+    def _poll_busy(self, start):
+        while epdconfig.digital_read(self.busy_pin) == 0:
+            if time.monotonic() - start >= self.busy_timeout:
+                return False
+            epdconfig.delay_ms(BUSY_POLL_MS)
+            self.send_command(0x71)
+        return True
         
+    @operation('init')
     def init(self):
         if (epdconfig.module_init() != 0):
             return -1
         # EPD hardware init start
         self.reset()
-        
-        self.send_command(0x06)     # btst
-        self.send_data(0x17)
-        self.send_data(0x17)
-        self.send_data(0x28)        # If an exception is displayed, try using 0x38
-        self.send_data(0x17)
-        
-        self.send_command(0x01)			#POWER SETTING
-        self.send_data(0x07)
-        self.send_data(0x07)    #VGH=20V,VGL=-20V
-        self.send_data(0x28)		#VDH=15V
-        self.send_data(0x17)		#VDL=-15V
-
-        self.send_command(0x04) #POWER ON
-        epdconfig.delay_ms(100)
-        self.ReadBusy()
-
-        self.send_command(0X00)			#PANNEL SETTING
-        self.send_data(0x1F)   #KW-3f   KWR-2F	BWROTP 0f	BWOTP 1f
-
-        self.send_command(0x61)        	#tres
-        self.send_data(0x03)		#source 800
-        self.send_data(0x20)
-        self.send_data(0x01)		#gate 480
-        self.send_data(0xE0)
-
-        self.send_command(0X15)
-        self.send_data(0x00)
-
-        # If the screen appears gray, use the annotated initialization command
-        self.send_command(0X50)
-        self.send_data(0x10)
-        self.send_data(0x07)
-        # self.send_command(0X50)
-        # self.send_data(0x10)
-        # self.send_data(0x17)
-        # self.send_command(0X52)		
-        # self.send_data(0x03)
-
-        self.send_command(0X60)			#TCON SETTING
-        self.send_data(0x22)
-
+        self.run_sequence(INIT_FULL)
         # EPD hardware init end
         return 0
-    
+
+    @operation('init')
     def init_fast(self):
         if (epdconfig.module_init() != 0):
             return -1
         # EPD hardware init start
         self.reset()
-        
-        self.send_command(0X00)			#PANNEL SETTING
-        self.send_data(0x1F)   #KW-3f   KWR-2F	BWROTP 0f	BWOTP 1f
-
-        # If the screen appears gray, use the annotated initialization command
-        self.send_command(0X50)
-        self.send_data(0x10)
-        self.send_data(0x07)
-        # self.send_command(0X50)
-        # self.send_data(0x10)
-        # self.send_data(0x17)
-        # self.send_command(0X52)		
-        # self.send_data(0x03)
-
-        self.send_command(0x04) #POWER ON
-        epdconfig.delay_ms(100) 
-        self.ReadBusy()        #waiting for the electronic paper IC to release the idle signal
-
-        #Enhanced display drive(Add 0x06 command)
-        self.send_command(0x06)			#Booster Soft Start 
-        self.send_data (0x27)
-        self.send_data (0x27)   
-        self.send_data (0x18)		
-        self.send_data (0x17)		
-
-        self.send_command(0xE0)
-        self.send_data(0x02)
-        self.send_command(0xE5)
-        self.send_data(0x5A)
-
+        self.run_sequence(INIT_FAST)
         # EPD hardware init end
         return 0
-    
+
+    @operation('init')
     def init_part(self):
         if (epdconfig.module_init() != 0):
             return -1
         # EPD hardware init start
         self.reset()
-
-        self.send_command(0X00)			#PANNEL SETTING
-        self.send_data(0x1F)   #KW-3f   KWR-2F	BWROTP 0f	BWOTP 1f
-
-        self.send_command(0x04) #POWER ON
-        epdconfig.delay_ms(100) 
-        self.ReadBusy()        #waiting for the electronic paper IC to release the idle signal
-
-        self.send_command(0xE0)
-        self.send_data(0x02)
-        self.send_command(0xE5)
-        self.send_data(0x6E)
-
+        self.run_sequence(INIT_PART)
         # EPD hardware init end
         return 0
-    
+
     # The feature will only be available on screens sold after 24/10/23
+    @operation('init')
     def init_4Gray(self):
         if (epdconfig.module_init() != 0):
             return -1
         # EPD hardware init start
         self.reset()
-
-        self.send_command(0X00)			#PANNEL SETTING
-        self.send_data(0x1F)   #KW-3f   KWR-2F	BWROTP 0f	BWOTP 1f
-        
-        self.send_command(0X50)
-        self.send_data(0x10)
-        self.send_data(0x07)
-
-        self.send_command(0x04) #POWER ON
-        epdconfig.delay_ms(100) 
-        self.ReadBusy()        #waiting for the electronic paper IC to release the idle signal
-
-        #Enhanced display drive(Add 0x06 command)
-        self.send_command(0x06)			#Booster Soft Start 
-        self.send_data (0x27)
-        self.send_data (0x27)   
-        self.send_data (0x18)		
-        self.send_data (0x17)	
-
-        self.send_command(0xE0)
-        self.send_data(0x02)
-        self.send_command(0xE5)
-        self.send_data(0x5F)
-
+        self.run_sequence(INIT_4GRAY)
         # EPD hardware init end
         return 0
 
     def getbuffer(self, image):
-        img = image
-        imwidth, imheight = img.size
-        if(imwidth == self.width and imheight == self.height):
-            img = img.convert('1')
-        elif(imwidth == self.height and imheight == self.width):
-            # image has correct dimensions, but needs to be rotated
-            img = img.rotate(90, expand=True).convert('1')
-        else:
-            logger.warning("Wrong image dimensions: must be " + str(self.width) + "x" + str(self.height))
-            # return a blank buffer
-            return [0x00] * (int(self.width/8) * self.height)
-
-        buf = bytearray(img.tobytes('raw'))
-        # The bytes need to be inverted, because in the PIL world 0=black and 1=white, but
-        # in the e-paper world 0=white and 1=black.
-        for i in range(len(buf)):
-            buf[i] ^= 0xFF
-        return buf
+        return packing.pack_raw(image, self.width, self.height, invert=True)
     
+    # 2 bits per pixel, first pixel in the high bits (see packing.GRAY4_LUT)
     def getbuffer_4Gray(self, image):
-        # logger.debug("bufsiz = ",int(self.width/8) * self.height)
-        buf = [0xFF] * (int(self.width / 4) * self.height)
-        image_monocolor = image.convert('L')
-        imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
-        i=0
-        # logger.debug("imwidth = %d, imheight = %d",imwidth,imheight)
-        if(imwidth == self.width and imheight == self.height):
-            logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    # Set the bits for the column of pixels at the current position.
-                    if(pixels[x, y] == 0xC0):
-                        pixels[x, y] = 0x80
-                    elif (pixels[x, y] == 0x80):
-                        pixels[x, y] = 0x40
-                    i= i+1
-                    if(i%4 == 0):
-                        buf[int((x + (y * self.width))/4)] = ((pixels[x-3, y]&0xc0) | (pixels[x-2, y]&0xc0)>>2 | (pixels[x-1, y]&0xc0)>>4 | (pixels[x, y]&0xc0)>>6)
-                        
-        elif(imwidth == self.height and imheight == self.width):
-            logger.debug("Horizontal")
-            for x in range(imwidth):
-                for y in range(imheight):
-                    newx = y
-                    newy = self.height - x - 1
-                    if(pixels[x, y] == 0xC0):
-                        pixels[x, y] = 0x80
-                    elif (pixels[x, y] == 0x80):
-                        pixels[x, y] = 0x40
-                    i= i+1
-                    if(i%4 == 0):
-                        buf[int((newx + (newy * self.width))/4)] = ((pixels[x, y-3]&0xc0) | (pixels[x, y-2]&0xc0)>>2 | (pixels[x, y-1]&0xc0)>>4 | (pixels[x, y]&0xc0)>>6) 
-        return buf
+        img = packing.gray4_image(image, self.width, self.height)
+        if img is None:
+            return [0xFF] * (int(self.width / 4) * self.height)
+        return packing.pack_levels(img, packing.GRAY4_LUT, 2)
 
+    # image: packed frame (bytes, bytearray, memoryview or list), as from getbuffer()
+    @operation('display')
     def display(self, image):
-        if(self.width % 8 == 0):
-            Width = self.width // 8
-        else:
-            Width = self.width // 8 +1
-        Height = self.height
-        image1 = [0xFF] * int(self.width * self.height / 8)
-        for j in range(Height):
-                for i in range(Width):
-                    image1[i + j * Width] = ~image[i + j * Width]
-        self.send_command(0x10)
-        self.send_data2(image1)
-
-        self.send_command(0x13)
-        self.send_data2(image)
-
-        self.send_command(0x12)
-        epdconfig.delay_ms(100)
-        self.ReadBusy()
+        # Old data plane is the inverted frame (one bytes.translate)
+        self.send_command_data(0x10, packing.invert_bytes(image))
+        self.send_command_data(0x13, image)
+        self.run_sequence(REFRESH)
 
+    @operation('clear')
     def Clear(self):
-        self.send_command(0x10)
-        self.send_data2([0xFF] * int(self.width * self.height / 8))
-        self.send_command(0x13)
-        self.send_data2([0x00] * int(self.width * self.height / 8))
-
-        self.send_command(0x12)
-        epdconfig.delay_ms(100)
-        self.ReadBusy()
+        self.send_command_data(0x10, self._clear_old)
+        self.send_command_data(0x13, self._clear_new)
+        self.run_sequence(REFRESH)
 
+    @operation('partial')
     def display_Partial(self, Image, Xstart, Ystart, Xend, Yend):
         if((Xstart % 8 + Xend % 8 == 8 & Xstart % 8 > Xend % 8) | Xstart % 8 + Xend % 8 == 0 | (Xend - Xstart)%8 == 0):
             Xstart = Xstart // 8 * 8
@@ -334,116 +264,30 @@ class EPD:
         Width = (Xend - Xstart) // 8
         Height = Yend - Ystart
 	
-        self.send_command(0x50)
-        self.send_data(0xA9)
-        self.send_data(0x07)
-
-        self.send_command(0x91)		#This command makes the display enter partial mode
-        self.send_command(0x90)		#resolution setting
-        self.send_data (Xstart//256)
-        self.send_data (Xstart%256)   #x-start    
-
-        self.send_data ((Xend-1)//256)		
-        self.send_data ((Xend-1)%256)  #x-end	
-
-        self.send_data (Ystart//256)  #
-        self.send_data (Ystart%256)   #y-start    
-
-        self.send_data ((Yend-1)//256)		
-        self.send_data ((Yend-1)%256)  #y-end
-        self.send_data (0x01)
-
-        image1 = [0xFF] * int(self.width * self.height / 8)
-        for j in range(Height):
-                for i in range(Width):
-                    image1[i + j * Width] = ~Image[i + j * Width]
-
-        self.send_command(0x13)   #Write Black and White image to RAM
-        self.send_data2(image1)
-
-        self.send_command(0x12)
-        epdconfig.delay_ms(100)
-        self.ReadBusy()
-
+        self.send_command_data(0x50, b'\xA9\x07')
+        self.send_command_data(0x91)		#This command makes the display enter partial mode
+        self.send_command_data(0x90, bytes((	#resolution setting
+            Xstart // 256, Xstart % 256,            #x-start
+            (Xend - 1) // 256, (Xend - 1) % 256,    #x-end
+            Ystart // 256, Ystart % 256,            #y-start
+            (Yend - 1) // 256, (Yend - 1) % 256,    #y-end
+            0x01)))
+
+        # Exactly the window's bytes (more would wrap around inside the window),
+        # inverted for the partial-mode data polarity set above
+        self.send_command_data(0x13, packing.invert_bytes(Image[:Width * Height]))   #Write Black and White image to RAM
+        self.run_sequence(REFRESH)
+
+    @operation('display')
     def display_4Gray(self, image):
-        self.send_command(0x10)
-        for i in range(0, 48000):     
-            temp3=0
-            for j in range(0, 2):
-                temp1 = image[i*2+j]
-                for k in range(0, 2):
-                    temp2 = temp1&0xC0 
-                    if(temp2 == 0xC0):
-                        temp3 |= 0x00
-                    elif(temp2 == 0x00):
-                        temp3 |= 0x01  
-                    elif(temp2 == 0x80): 
-                        temp3 |= 0x01 
-                    else: #0x40
-                        temp3 |= 0x00 
-                    temp3 <<= 1	
-                    
-                    temp1 <<= 2
-                    temp2 = temp1&0xC0 
-                    if(temp2 == 0xC0): 
-                        temp3 |= 0x00
-                    elif(temp2 == 0x00): 
-                        temp3 |= 0x01
-                    elif(temp2 == 0x80):
-                        temp3 |= 0x01
-                    else :   #0x40
-                        temp3 |= 0x00	
-                    if(j!=1 or k!=1):				
-                        temp3 <<= 1
-                    temp1 <<= 2
-            self.send_data(temp3)
-            
-        self.send_command(0x13)	       
-        for i in range(0, 48000):       
-            temp3=0
-            for j in range(0, 2):
-                temp1 = image[i*2+j]
-                for k in range(0, 2):
-                    temp2 = temp1&0xC0 
-                    if(temp2 == 0xC0):
-                        temp3 |= 0x00
-                    elif(temp2 == 0x00):
-                        temp3 |= 0x01
-                    elif(temp2 == 0x80):
-                        temp3 |= 0x00
-                    else: #0x40
-                        temp3 |= 0x01 
-                    temp3 <<= 1	
-                    
-                    temp1 <<= 2
-                    temp2 = temp1&0xC0 
-                    if(temp2 == 0xC0): 
-                        temp3 |= 0x00
-                    elif(temp2 == 0x00): 
-                        temp3 |= 0x01
-                    elif(temp2 == 0x80):
-                        temp3 |= 0x00 
-                    else:    #0x40
-                            temp3 |= 0x01	
-                    if(j!=1 or k!=1):					
-                        temp3 <<= 1
-                    temp1 <<= 2
-            self.send_data(temp3)
-        
-        self.send_command(0x12)
-        epdconfig.delay_ms(100)
-        self.ReadBusy()
+        self.send_command_data(0x10, packing.gray4_plane(image, 0))
+        self.send_command_data(0x13, packing.gray4_plane(image, 1))
+        self.run_sequence(REFRESH)
 
+    @operation('sleep')
     def sleep(self):
-        self.send_command(0x50)
-        self.send_data(0XF7)
-        
-        self.send_command(0x02) # POWER_OFF
-        self.ReadBusy()
-        
-        self.send_command(0x07) # DEEP_SLEEP
-        self.send_data(0XA5)
-        
+        self.run_sequence(SLEEP)
+
         epdconfig.delay_ms(2000)
         epdconfig.module_exit()
 ### END OF FILE ###
@@ -32,11 +32,29 @@ import logging
 import sys
 import time
 import subprocess
+from collections import Counter
 
 from ctypes import *
 
 logger = logging.getLogger(__name__)
 
+# SPI clock and the largest block handed to one writebytes2() call. Override with
+# EPD_SPI_HZ / EPD_SPI_CHUNK or configure_spi(); measure with spi_calibrate.py.
+# writebytes2 splits further at the spidev bufsiz (4096 unless raised on the kernel cmdline).
+SPI_SPEED_HZ = int(os.environ.get('EPD_SPI_HZ', 4000000))
+SPI_CHUNK    = int(os.environ.get('EPD_SPI_CHUNK', 4096))
+
+
+def _write_chunked(spi, data, chunk):
+    # spidev writebytes2() in blocks of at most `chunk` bytes
+    if len(data) <= chunk:
+        spi.writebytes2(data)
+        return
+    if not isinstance(data, list):
+        data = memoryview(data)
+    for i in range(0, len(data), chunk):
+        spi.writebytes2(data[i:i + chunk])
+
 
 class RaspberryPi:
     # Pin definition
@@ -59,9 +77,26 @@ class RaspberryPi:
         self.GPIO_PWR_PIN    = gpiozero.LED(self.PWR_PIN)
         self.GPIO_BUSY_PIN   = gpiozero.Button(self.BUSY_PIN, pull_up = False)
 
-        
+        self.spi_speed_hz = SPI_SPEED_HZ
+        self.spi_chunk = SPI_CHUNK
+        # Transport counters: gpio_writes, transactions (SPI write calls), bytes
+        self.stats = Counter()
+
+    def configure_spi(self, speed_hz=None, chunk=None):
+        # Change the SPI clock (applied now if the bus is open) and/or the
+        # writebytes2 block size; returns the settings in effect
+        if speed_hz is not None:
+            self.spi_speed_hz = int(speed_hz)
+            try:
+                self.SPI.max_speed_hz = self.spi_speed_hz
+            except OSError:
+                pass  # bus closed; module_init applies it
+        if chunk is not None:
+            self.spi_chunk = max(1, int(chunk))
+        return self.spi_speed_hz, self.spi_chunk
 
     def digital_write(self, pin, value):
+        self.stats['gpio_writes'] += 1
         if pin == self.RST_PIN:
             if value:
                 self.GPIO_RST_PIN.on()
@@ -99,10 +134,38 @@ class RaspberryPi:
         time.sleep(delaytime / 1000.0)
 
     def spi_writebyte(self, data):
+        self.stats['transactions'] += 1
+        self.stats['bytes'] += len(data)
         self.SPI.writebytes(data)
 
     def spi_writebyte2(self, data):
-        self.SPI.writebytes2(data)
+        self.stats['transactions'] += 1
+        self.stats['bytes'] += len(data)
+        _write_chunked(self.SPI, data, self.spi_chunk)
+
+    def wait_for_pin(self, pin, value, timeout=None):
+        # Block on gpiozero's edge event instead of polling; True once pin == value,
+        # False on timeout (seconds, None = forever)
+        if pin != self.BUSY_PIN:
+            raise ValueError("only the BUSY pin supports edge waits")
+        if value:
+            return bool(self.GPIO_BUSY_PIN.wait_for_active(timeout))
+        return bool(self.GPIO_BUSY_PIN.wait_for_inactive(timeout))
+
+    def spi_write_command(self, command, data=None):
+        # One transaction: command byte (DC low), then its payload (DC high)
+        stats = self.stats
+        stats['gpio_writes'] += 1
+        stats['transactions'] += 1
+        stats['bytes'] += 1
+        self.GPIO_DC_PIN.off()
+        self.SPI.writebytes([command])
+        if data:
+            stats['gpio_writes'] += 1
+            stats['transactions'] += 1
+            stats['bytes'] += len(data)
+            self.GPIO_DC_PIN.on()
+            _write_chunked(self.SPI, data, self.spi_chunk)
 
     def DEV_SPI_write(self, data):
         self.DEV_SPI.DEV_SPI_SendData(data)
@@ -141,7 +204,7 @@ class RaspberryPi:
         else:
             # SPI device, bus = 0, device = 0
             self.SPI.open(0, 0)
-            self.SPI.max_speed_hz = 4000000
+            self.SPI.max_speed_hz = self.spi_speed_hz
             self.SPI.mode = 0b00
         return 0
 
@@ -192,7 +255,24 @@ class JetsonNano:
         import Jetson.GPIO
         self.GPIO = Jetson.GPIO
 
+        self.spi_speed_hz = SPI_SPEED_HZ
+        self.spi_chunk = SPI_CHUNK
+        # Transport counters: gpio_writes, transactions (SPI write calls), bytes
+        self.stats = Counter()
+
+    def configure_spi(self, speed_hz=None, chunk=None):
+        # Same interface as RaspberryPi.configure_spi. The bit-banged sysfs SPI
+        # has no clock setting and sends byte by byte, so both values are only
+        # recorded (and reported); returns the settings in effect
+        if speed_hz is not None:
+            self.spi_speed_hz = int(speed_hz)
+            logger.debug("software SPI: clock is set by GPIO speed, %d Hz ignored", self.spi_speed_hz)
+        if chunk is not None:
+            self.spi_chunk = max(1, int(chunk))
+        return self.spi_speed_hz, self.spi_chunk
+
     def digital_write(self, pin, value):
+        self.stats['gpio_writes'] += 1
         self.GPIO.output(pin, value)
 
     def digital_read(self, pin):
@@ -202,12 +282,26 @@ class JetsonNano:
         time.sleep(delaytime / 1000.0)
 
     def spi_writebyte(self, data):
+        self.stats['transactions'] += 1
+        self.stats['bytes'] += 1
         self.SPI.SYSFS_software_spi_transfer(data[0])
 
     def spi_writebyte2(self, data):
+        self.stats['transactions'] += 1
+        self.stats['bytes'] += len(data)
         for i in range(len(data)):
             self.SPI.SYSFS_software_spi_transfer(data[i])
 
+    def spi_write_command(self, command, data=None):
+        # One transaction: command byte (DC low), then its payload (DC high)
+        self.digital_write(self.DC_PIN, 0)
+        self.digital_write(self.CS_PIN, 0)
+        self.spi_writebyte([command])
+        if data:
+            self.digital_write(self.DC_PIN, 1)
+            self.spi_writebyte2(data)
+        self.digital_write(self.CS_PIN, 1)
+
     def module_init(self):
         self.GPIO.setmode(self.GPIO.BCM)
         self.GPIO.setwarnings(False)
@@ -250,7 +344,26 @@ class SunriseX3:
         self.GPIO = Hobot.GPIO
         self.SPI = spidev.SpiDev()
 
+        self.spi_speed_hz = SPI_SPEED_HZ
+        self.spi_chunk = SPI_CHUNK
+        # Transport counters: gpio_writes, transactions (SPI write calls), bytes
+        self.stats = Counter()
+
+    def configure_spi(self, speed_hz=None, chunk=None):
+        # Change the SPI clock (applied now if the bus is open) and/or the
+        # writebytes2 block size; returns the settings in effect
+        if speed_hz is not None:
+            self.spi_speed_hz = int(speed_hz)
+            try:
+                self.SPI.max_speed_hz = self.spi_speed_hz
+            except OSError:
+                pass  # bus closed; module_init applies it
+        if chunk is not None:
+            self.spi_chunk = max(1, int(chunk))
+        return self.spi_speed_hz, self.spi_chunk
+
     def digital_write(self, pin, value):
+        self.stats['gpio_writes'] += 1
         self.GPIO.output(pin, value)
 
     def digital_read(self, pin):
@@ -260,12 +373,25 @@ class SunriseX3:
         time.sleep(delaytime / 1000.0)
 
     def spi_writebyte(self, data):
+        self.stats['transactions'] += 1
+        self.stats['bytes'] += len(data)
         self.SPI.writebytes(data)
 
     def spi_writebyte2(self, data):
-        # for i in range(len(data)):
-        #     self.SPI.writebytes([data[i]])
-        self.SPI.xfer3(data)
+        # Write-only like the Pi (xfer3 also read back and allocated a reply per call)
+        self.stats['transactions'] += 1
+        self.stats['bytes'] += len(data)
+        _write_chunked(self.SPI, data, self.spi_chunk)
+
+    def spi_write_command(self, command, data=None):
+        # One transaction: command byte (DC low), then its payload (DC high)
+        self.digital_write(self.DC_PIN, 0)
+        self.digital_write(self.CS_PIN, 0)
+        self.spi_writebyte([command])
+        if data:
+            self.digital_write(self.DC_PIN, 1)
+            self.spi_writebyte2(data)
+        self.digital_write(self.CS_PIN, 1)
 
     def module_init(self):
         if self.Flag == 0:
@@ -282,7 +408,7 @@ class SunriseX3:
         
             # SPI device, bus = 0, device = 0
             self.SPI.open(2, 0)
-            self.SPI.max_speed_hz = 4000000
+            self.SPI.max_speed_hz = self.spi_speed_hz
             self.SPI.mode = 0b00
             return 0
         else:
@@ -301,20 +427,29 @@ class SunriseX3:
         self.GPIO.cleanup([self.RST_PIN, self.DC_PIN, self.CS_PIN, self.BUSY_PIN], self.PWR_PIN)
 
 
-if sys.version_info[0] == 2:
-    process = subprocess.Popen("cat /proc/cpuinfo | grep Raspberry", shell=True, stdout=subprocess.PIPE)
-else:
-    process = subprocess.Popen("cat /proc/cpuinfo | grep Raspberry", shell=True, stdout=subprocess.PIPE, text=True)
-output, _ = process.communicate()
-if sys.version_info[0] == 2:
-    output = output.decode(sys.stdout.encoding)
-
-if "Raspberry" in output:
-    implementation = RaspberryPi()
-elif os.path.exists('/sys/bus/platform/drivers/gpio-x3'):
-    implementation = SunriseX3()
+def _detect_implementation():
+    if sys.version_info[0] == 2:
+        process = subprocess.Popen("cat /proc/cpuinfo | grep Raspberry", shell=True, stdout=subprocess.PIPE)
+    else:
+        process = subprocess.Popen("cat /proc/cpuinfo | grep Raspberry", shell=True, stdout=subprocess.PIPE, text=True)
+    output, _ = process.communicate()
+    if sys.version_info[0] == 2:
+        output = output.decode(sys.stdout.encoding)
+
+    if "Raspberry" in output:
+        return RaspberryPi()
+    elif os.path.exists('/sys/bus/platform/drivers/gpio-x3'):
+        return SunriseX3()
+    else:
+        return JetsonNano()
+
+
+# EPD_BACKEND=virtual: emulated panel for development machines (see virtual.py)
+if os.environ.get('EPD_BACKEND', '').lower() == 'virtual':
+    from .virtual import VirtualBackend
+    implementation = VirtualBackend()
 else:
-    implementation = JetsonNano()
+    implementation = _detect_implementation()
 
 for func in [x for x in dir(implementation) if not x.startswith('_')]:
     setattr(sys.modules[__name__], func, getattr(implementation, func))
@@ -0,0 +1,185 @@
+# *****************************************************************************
+# * | File        :   packing.py
+# * | Function    :   Shared frame buffer packing for the e-paper drivers
+# * | Info        :
+# *----------------
+# * | Info        :   Byte-identical replacement for the per-pixel getbuffer loops
+# -----------------------------------------------------------------------------
+# The drivers used to pack frames pixel by pixel in Python (or invert 48,000
+# bytes one at a time). Here Pillow does the dithering, rotation and bit packing
+# in C and inversion is a single bytes.translate, so getbuffer costs a few ms
+# instead of seconds on a Pi Zero.
+#
+# Two legacy families exist and both are reproduced exactly:
+#
+#   pack_raw   rotate, then convert('1'), Pillow's raw row bytes (bytearray),
+#              optionally inverted to panel polarity (1 = black)
+#   pack_mono  convert('1'), then rotate; 1 = white, rows padded to whole bytes
+#              with white (list of ints, drivers index and ~ its items)
+#
+# pack_levels covers drivers that map black/white to multi-bit pixel codes.
+# raw_image / mono_image / gray4_image return the oriented image before packing,
+# for streaming a frame in row bands (stream.py) instead of as one buffer.
+#
+# pack_palette is the colour drivers' getbuffer (ACeP 7-colour, Spectra
+# 6-colour at 4 bits, the 4-colour "g" panels at 2 bits): quantize to the panel
+# palette (palette image built once per palette) and pack with Pillow's P;4 /
+# P;2 packer, as bytes.
+#
+
+
+import functools
+import logging
+from PIL import Image, ImageChops
+
+logger = logging.getLogger(__name__)
+
+# byte -> byte ^ 0xFF (PIL '1' uses 1 = white, most panels 1 = black)
+INVERT = bytes(0xFF ^ i for i in range(256))
+
+
+def invert_bytes(buf):
+    """Return `buf` (bytes-like or list of ints) with every bit flipped, as bytes."""
+    return bytes(buf).translate(INVERT)
+
+
+def pad_rows(img):
+    """Return mode '1' `img` widened with white columns to a multiple of 8 pixels."""
+    if img.width % 8 == 0:
+        return img
+    padded = Image.new('1', ((img.width + 7) // 8 * 8, img.height), 1)
+    padded.paste(img, (0, 0))
+    return padded
+
+
+def raw_image(image, width, height):
+    """pack_raw's mode '1' image (portrait rotated before dithering), None on wrong dimensions."""
+    imwidth, imheight = image.size
+    if imwidth == width and imheight == height:
+        return image.convert('1')
+    if imwidth == height and imheight == width:
+        return image.rotate(90, expand=True).convert('1')
+    logger.warning("Wrong image dimensions: must be " + str(width) + "x" + str(height))
+    return None
+
+
+def pack_raw(image, width, height, invert=False, blank=0x00):
+    """getbuffer() of the raw-bytes drivers.
+
+    Portrait images are rotated 90 degrees before dithering. Wrong dimensions log a
+    warning and return a blank buffer (list of `blank`).
+    """
+    img = raw_image(image, width, height)
+    if img is None:
+        return [blank] * (int(width / 8) * height)
+    buf = img.tobytes('raw')
+    if invert:
+        buf = buf.translate(INVERT)
+    return bytearray(buf)
+
+
+def mono_image(image, width, height):
+    """pack_mono's mode '1' image (dithered, then rotated, rows padded), None on wrong dimensions."""
+    img = image.convert('1')
+    if img.size == (width, height):
+        pass
+    elif img.size == (height, width):
+        img = img.transpose(Image.ROTATE_90)
+    else:
+        return None
+    return pad_rows(img)
+
+
+def pack_mono(image, width, height):
+    """getbuffer() of the pixel-loop drivers (1 = white).
+
+    The image is dithered first and rotated after. Wrong dimensions return an
+    all-white buffer, like the loops did.
+    """
+    img = mono_image(image, width, height)
+    if img is None:
+        return [0xFF] * ((width + 7) // 8 * height)
+    return list(img.tobytes('raw'))
+
+
+def pack_levels(img, lut, bits):
+    """Return mode '1'/'L' `img` mapped through `lut` (256 codes) and packed
+    `bits` (2 or 4) per pixel, first pixel in the high bits (list of ints)."""
+    codes = img.convert('L').point(lut)
+    codes.putpalette([0, 0, 0] * 256)  # 'L' -> 'P' in place, data untouched
+    return list(codes.tobytes('raw', 'P;%d' % bits))
+
+
+# Waveshare 4-gray: 'L' level -> 2-bit code, 0 black, 1 gray (0x80), 2 light
+# gray (0xC0), 3 white; other levels fall into their top two bits
+GRAY4_LUT = [v >> 6 for v in range(256)]
+GRAY4_LUT[0xC0], GRAY4_LUT[0x80] = 2, 1
+
+
+def gray4_image(image, width, height):
+    """getbuffer_4Gray's 'L' image (portrait transposed), None on wrong dimensions."""
+    img = image.convert('L')
+    if img.size == (height, width):
+        logger.debug("Horizontal")
+        return img.transpose(Image.ROTATE_90)
+    if img.size != (width, height):
+        return None
+    return img
+
+
+def _nibble_tables(bits):
+    # byte of four 2-bit codes -> their four plane bits, as (high, low) nibble tables
+    low = bytes(bits[b >> 6] << 3 | bits[b >> 4 & 3] << 2 | bits[b >> 2 & 3] << 1 | bits[b & 3]
+                for b in range(256))
+    return bytes(n << 4 for n in low), low
+
+
+# Plane bit per 2-bit code: plane 0 (old/0x10, 0x24) has black and light gray
+# set, plane 1 (new/0x13, 0x26) black and gray
+_GRAY4_PLANES = (_nibble_tables((1, 0, 1, 0)), _nibble_tables((1, 1, 0, 0)))
+
+
+def gray4_plane(buf, plane):
+    """Return 1-bit `plane` (0 or 1) of 2-bit 4-gray data `buf` (even length), as bytes."""
+    table_hi, table_lo = _GRAY4_PLANES[plane]
+    buf = bytes(buf)
+    hi, lo = buf[0::2], buf[1::2]
+    # Even bytes give the high nibble of each plane byte, odd bytes the low one
+    return (int.from_bytes(hi.translate(table_hi), 'big') | int.from_bytes(lo.translate(table_lo), 'big')).to_bytes(len(hi), 'big')
+
+
+@functools.lru_cache(maxsize=None)
+def palette_image(palette):
+    """Return a 1x1 'P' image carrying `palette` (tuple of RGB values), for quantize()."""
+    pal_image = Image.new('P', (1, 1))
+    pal_image.putpalette(tuple(palette) + (0, 0, 0) * (256 - len(palette) // 3))
+    return pal_image
+
+
+def pack_palette(image, width, height, palette, exact=False, blank=0x11, bits=4):
+    """getbuffer() of the palette drivers (bytes, `bits` (4 or 2) per pixel, first
+    pixel in the high bits, rows padded to whole bytes with index 0).
+
+    Portrait images are rotated 90 degrees. Colours are quantized to `palette`
+    with dithering, or with `exact` mapped only where they match a palette colour
+    exactly (anything else becomes index 0). Wrong dimensions log a warning and
+    return a buffer filled with `blank`.
+    """
+    imwidth, imheight = image.size
+    if imwidth == width and imheight == height:
+        img = image
+    elif imwidth == height and imheight == width:
+        img = image.rotate(90, expand=True)
+    else:
+        logger.warning("Wrong image dimensions: must be " + str(width) + "x" + str(height))
+        return bytes([blank]) * ((width * bits + 7) // 8 * height)
+    img = img.convert('RGB')
+    if exact:
+        indexed = img.quantize(palette=palette_image(palette), dither=Image.Dither.NONE)
+        # Pixels whose nearest palette colour isn't an exact match -> index 0
+        r, g, b = ImageChops.difference(img, indexed.convert('RGB')).split()
+        mismatch = ImageChops.lighter(ImageChops.lighter(r, g), b).point(lambda v: 255 if v else 0)
+        indexed.paste(0, mask=mismatch)
+    else:
+        indexed = img.quantize(palette=palette_image(palette))
+    return indexed.tobytes('raw', 'P;%d' % bits)
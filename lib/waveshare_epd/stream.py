@@ -0,0 +1,54 @@
+# *****************************************************************************
+# * | File        :   stream.py
+# * | Function    :   Streaming frame sources for the e-paper drivers
+# * | Info        :
+# *----------------
+# A frame is sent to the panel as a sequence of chunks instead of one buffer,
+# so nothing frame-sized has to exist as a Python list (8 bytes of pointer per
+# panel byte) on the way to SPI. Each generator yields bytes-like chunks that
+# EPD.send_frame() writes straight to epdconfig.spi_writebyte2:
+#
+#   buffer_chunks  bytes / bytearray / memoryview / mmap (zero-copy slices) or list
+#   image_chunks   mode '1' image, packed `rows` rows at a time
+#   gray4_chunks   'L' image as 2-bit 4-gray codes, `rows` rows at a time
+#   fill_chunks    one byte value repeated (Clear)
+#
+# Memory per chunk is constant; image sources only keep the (already dithered)
+# source image plus one band.
+#
+
+
+from . import packing
+
+CHUNK_BYTES = 4096  # buffer chunk size (the spidev default bufsiz)
+CHUNK_ROWS = 32     # image band height
+
+
+def buffer_chunks(frame, chunk=CHUNK_BYTES):
+    """Yield `frame` in slices of `chunk` bytes (memoryview slices, no copies)."""
+    if not isinstance(frame, list):
+        frame = memoryview(frame).cast('B')
+    for start in range(0, len(frame), chunk):
+        yield frame[start:start + chunk]
+
+
+def image_chunks(img, rows=CHUNK_ROWS, invert=False):
+    """Yield the raw packed rows of mode '1' `img`, `rows` rows at a time."""
+    for top in range(0, img.height, rows):
+        band = img.crop((0, top, img.width, min(top + rows, img.height))).tobytes('raw')
+        yield band.translate(packing.INVERT) if invert else band
+
+
+def gray4_chunks(img, rows=CHUNK_ROWS):
+    """Yield 'L' `img` as packed 2-bit codes (packing.GRAY4_LUT), `rows` rows at a time."""
+    for top in range(0, img.height, rows):
+        codes = img.crop((0, top, img.width, min(top + rows, img.height))).point(packing.GRAY4_LUT)
+        codes.putpalette([0, 0, 0] * 256)  # 'L' -> 'P' in place, data untouched
+        yield codes.tobytes('raw', 'P;2')
+
+
+def fill_chunks(value, size, chunk=CHUNK_BYTES):
+    """Yield `size` bytes of `value` in chunks of at most `chunk` bytes."""
+    block = bytes([value]) * min(chunk, size)
+    for start in range(0, size, chunk):
+        yield block[:size - start]
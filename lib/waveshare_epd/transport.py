@@ -0,0 +1,68 @@
+# *****************************************************************************
+# * | File        :   transport.py
+# * | Function    :   Per-operation transport counters for the e-paper drivers
+# * | Info        :
+# *----------------
+# The epdconfig backends count GPIO writes, SPI transactions and bytes in their
+# `stats` Counter. Driver methods decorated with @operation('display') etc. add
+# the difference over the call, plus wall time and ReadBusy time, to
+# `driver.transport_stats[name]`, so the cost of one init/display/partial/sleep
+# can be read off directly:
+#
+#   epd.transport_stats['display']
+#   -> Counter({'calls': 1, 'bytes': 96001, 'transactions': 3, 'gpio_writes': 6,
+#               'ms': 3950.2, 'busy_ms': 3812.0})
+#
+# Nested operations are attributed to the outermost one only.
+#
+
+
+import functools
+import time
+from collections import Counter
+from . import epdconfig
+
+# Backend counters attributed to operations
+BACKEND_KEYS = ('transactions', 'bytes', 'gpio_writes')
+# Columns of format_stats(), in order
+COLUMNS = ('calls', 'transactions', 'bytes', 'gpio_writes', 'ms', 'busy_ms')
+
+
+def _backend_stats():
+    return getattr(epdconfig, 'stats', None)
+
+
+def operation(name):
+    """Method decorator: account the call under transport_stats[name]."""
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if getattr(self, '_transport_depth', 0):
+                return method(self, *args, **kwargs)
+            stats = _backend_stats()
+            before = [stats[k] for k in BACKEND_KEYS] if stats is not None else None
+            busy_before = getattr(self, 'busy_ms_total', 0.0)
+            start = time.perf_counter()
+            self._transport_depth = 1
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self._transport_depth = 0
+                op = self.transport_stats.setdefault(name, Counter())
+                op['calls'] += 1
+                op['ms'] += (time.perf_counter() - start) * 1000
+                op['busy_ms'] += getattr(self, 'busy_ms_total', 0.0) - busy_before
+                if before is not None:
+                    for key, value in zip(BACKEND_KEYS, before):
+                        op[key] += stats[key] - value
+        return wrapper
+    return decorate
+
+
+def format_stats(transport_stats):
+    """Return transport_stats as an aligned text table (one row per operation)."""
+    lines = ['%-10s' % 'operation' + ''.join('%14s' % c for c in COLUMNS)]
+    for name, op in sorted(transport_stats.items()):
+        lines.append('%-10s' % name + ''.join(
+            '%14.1f' % op[c] if c.endswith('ms') else '%14d' % op[c] for c in COLUMNS))
+    return '\n'.join(lines)
@@ -0,0 +1,281 @@
+# *****************************************************************************
+# * | File        :   virtual.py
+# * | Function    :   Virtual hardware backend for epdconfig (no GPIO/SPI needed)
+# * | Info        :   Select with EPD_BACKEND=virtual
+# *----------------
+# Emulates SPI, the DC/CS/RST/PWR pins and the BUSY line of a UC8179 based panel
+# (epd7in5_V2 command set). Every transaction is counted and logged, the two RAM
+# planes are rebuilt from the data written to them (including partial windows)
+# and each DISPLAY_REFRESH (0x12) updates the emulated glass and calls the
+# on_refresh hook with the resulting PIL image.
+#
+# BUSY stays low for a realistic time per operation (BUSY_MS), scaled by
+# EPD_VIRTUAL_TIME_SCALE (default 1.0; 0 = instant, for benchmarks). delay_ms()
+# and the time bytes take on the wire at the configured SPI clock are scaled the
+# same way.
+#
+
+
+import logging
+import os
+import time
+from collections import Counter, deque
+from PIL import Image, ImageChops
+from . import epdconfig
+
+logger = logging.getLogger(__name__)
+
+# Simulated BUSY duration per operation (ms), close to what an 800x480 panel takes
+BUSY_MS = {
+    'power_on': 80,
+    'power_off': 40,
+    'full': 3800,
+    'fast': 1500,
+    'partial': 450,
+    '4gray': 2600,
+}
+
+LOG_SIZE = 2000  # recent (command, payload) transactions kept in VirtualBackend.log
+
+# 0xE5 (temperature override) value -> waveform selected by the driver's init_*
+_WAVEFORM_BY_E5 = {0x5A: 'fast', 0x6E: 'partial', 0x5F: '4gray'}
+
+_INVERT = bytes(0xFF ^ i for i in range(256))
+
+# 4-gray pixel from (0x10 plane bit, 0x13 plane bit), see display_4Gray
+_GRAY_LUT = [255, 128, 192, 0] + [0] * 252
+
+
+class _VirtualSPI:
+    """Stands in for spidev.SpiDev (drivers call epdconfig.SPI.writebytes2 directly)."""
+
+    def __init__(self, backend):
+        self._backend = backend
+        self.max_speed_hz = 0
+        self.mode = 0b00
+
+    def open(self, bus, device):
+        pass
+
+    def close(self):
+        pass
+
+    def writebytes(self, data):
+        self._backend._spi_write(data)
+
+    def writebytes2(self, data):
+        self._backend._spi_write(data)
+
+    def xfer3(self, data):
+        self._backend._spi_write(data)
+
+
+class VirtualBackend:
+    # Pin definition (same numbers as the Raspberry Pi HAT)
+    RST_PIN  = 17
+    DC_PIN   = 25
+    CS_PIN   = 8
+    BUSY_PIN = 24
+    PWR_PIN  = 18
+    MOSI_PIN = 10
+    SCLK_PIN = 11
+
+    def __init__(self, width=800, height=480, time_scale=None):
+        if time_scale is None:
+            time_scale = float(os.environ.get('EPD_VIRTUAL_TIME_SCALE', '1'))
+        self.width = width
+        self.height = height
+        self.time_scale = time_scale
+        self.SPI = _VirtualSPI(self)
+        self.spi_speed_hz = epdconfig.SPI_SPEED_HZ
+        self.spi_chunk = epdconfig.SPI_CHUNK
+        self.SPI.max_speed_hz = self.spi_speed_hz
+        self._row_bytes = width // 8
+        size = self._row_bytes * height
+        # RAM planes as written (0x10 "old", 0x13 "new") and what the glass shows
+        self.ram = {0x10: bytearray(size), 0x13: bytearray(size)}
+        self.glass = Image.new('1', (width, height), 1)
+        # Called as on_refresh(image, mode) after every refresh
+        self.on_refresh = None
+        self.log = deque(maxlen=LOG_SIZE)
+        self.stats = Counter()
+        self._pins = {self.RST_PIN: 0, self.DC_PIN: 0, self.CS_PIN: 1, self.PWR_PIN: 0}
+        self._busy_until = 0.0
+        self._reset_controller()
+
+    # ---- epdconfig interface ----
+    def digital_write(self, pin, value):
+        self.stats['gpio_writes'] += 1
+        if pin == self.RST_PIN and value and not self._pins.get(pin):
+            self._reset_controller()
+        self._pins[pin] = value
+
+    def digital_read(self, pin):
+        if pin == self.BUSY_PIN:
+            return 0 if time.monotonic() < self._busy_until else 1
+        return self._pins.get(pin, 0)
+
+    def wait_for_pin(self, pin, value, timeout=None):
+        if pin != self.BUSY_PIN:
+            raise ValueError("only the BUSY pin supports edge waits")
+        remaining = self._busy_until - time.monotonic()
+        if value == 0 or remaining <= 0:
+            return True
+        if timeout is not None and remaining > timeout:
+            time.sleep(timeout)
+            return False
+        time.sleep(remaining)
+        return True
+
+    def delay_ms(self, delaytime):
+        if self.time_scale > 0:
+            time.sleep(delaytime / 1000.0 * self.time_scale)
+
+    def spi_writebyte(self, data):
+        self._spi_write(data)
+
+    def spi_writebyte2(self, data):
+        self._spi_write(data)
+
+    def spi_write_command(self, command, data=None):
+        self.digital_write(self.DC_PIN, 0)
+        self._spi_write([command])
+        if data:
+            self.digital_write(self.DC_PIN, 1)
+            self._spi_write(data)
+
+    def module_init(self, cleanup=False):
+        self.stats['module_init'] += 1
+        self._pins[self.PWR_PIN] = 1
+        return 0
+
+    def module_exit(self, cleanup=False):
+        self.stats['module_exit'] += 1
+        self._pins[self.PWR_PIN] = 0
+
+    def configure_spi(self, speed_hz=None, chunk=None):
+        if speed_hz is not None:
+            self.spi_speed_hz = self.SPI.max_speed_hz = int(speed_hz)
+        if chunk is not None:
+            self.spi_chunk = max(1, int(chunk))
+        return self.spi_speed_hz, self.spi_chunk
+
+    def set_refresh_hook(self, callback):
+        """Register callback(image, mode), called after every emulated refresh."""
+        self.on_refresh = callback
+
+    # ---- Emulated controller ----
+    def _reset_controller(self):
+        self._command = None
+        self._args = bytearray()
+        self._ptr = 0
+        self._invert = False          # 0x50 DDX[0]: data written inverted
+        self._partial = False         # 0x91 partial in / 0x92 partial out
+        self._window = (0, 0, self._row_bytes, self.height)  # byte columns x rows
+        self._waveform = 'full'
+        self._asleep = False
+
+    def _spi_write(self, data):
+        data = bytes(data)
+        self.stats['transactions'] += 1
+        self.stats['bytes'] += len(data)
+        if self.time_scale > 0:
+            time.sleep(len(data) * 8 / self.spi_speed_hz * self.time_scale)
+        if self._pins[self.DC_PIN]:
+            self.stats['data_bytes'] += len(data)
+            self._data(data)
+        else:
+            self.stats['command_bytes'] += len(data)
+            for command in data:
+                self._begin(command)
+
+    def _begin(self, command):
+        if self._asleep:
+            self.stats['ignored_asleep'] += 1
+            return
+        self._command = command
+        self._args = bytearray()
+        self._ptr = 0
+        self.log.append((command, self._args))
+        if command == 0x04:
+            self._busy('power_on')
+        elif command == 0x02:
+            self._busy('power_off')
+        elif command == 0x91:
+            self._partial = True
+        elif command == 0x92:
+            self._partial = False
+            self._window = (0, 0, self._row_bytes, self.height)
+        elif command == 0x12:
+            self._refresh()
+
+    def _data(self, data):
+        if self._asleep or self._command is None:
+            return
+        if self._command in self.ram:
+            self._write_ram(self.ram[self._command], data)
+            return
+        self._args += data
+        args = self._args
+        if self._command == 0x50:
+            self._invert = bool(args[0] & 0x01)
+        elif self._command == 0x90 and len(args) >= 8:
+            x1 = (args[0] << 8 | args[1]) // 8
+            x2 = ((args[2] << 8 | args[3]) + 1) // 8
+            y1 = args[4] << 8 | args[5]
+            y2 = (args[6] << 8 | args[7]) + 1
+            self._window = (x1, y1, x2, y2)
+        elif self._command == 0xE5:
+            self._waveform = _WAVEFORM_BY_E5.get(args[0], 'full')
+        elif self._command == 0x07 and args[0] == 0xA5:
+            self._asleep = True
+
+    def _write_ram(self, plane, data):
+        x1, y1, x2, y2 = self._window if self._partial else (0, 0, self._row_bytes, self.height)
+        width = x2 - x1
+        total = width * (y2 - y1)
+        pos = 0
+        while pos < len(data) and total > 0:
+            k = self._ptr % total  # the address counter wraps inside the window
+            row, col = divmod(k, width)
+            n = min(width - col, len(data) - pos)
+            start = (y1 + row) * self._row_bytes + x1 + col
+            plane[start:start + n] = data[pos:pos + n]
+            pos += n
+            self._ptr += n
+
+    def _plane_image(self, command, box):
+        """Return RAM plane `command` inside byte box as a '1' image (1 = white)."""
+        x1, y1, x2, y2 = box
+        plane = self.ram[command]
+        rows = b''.join(plane[y * self._row_bytes + x1:y * self._row_bytes + x2] for y in range(y1, y2))
+        # RAM holds 1 = black unless the data polarity is inverted (partial mode)
+        if not self._invert:
+            rows = rows.translate(_INVERT)
+        return Image.frombytes('1', ((x2 - x1) * 8, y2 - y1), rows)
+
+    def _refresh(self):
+        mode = 'partial' if self._partial else self._waveform
+        box = self._window if self._partial else (0, 0, self._row_bytes, self.height)
+        if mode == '4gray':
+            old = self._plane_image(0x10, box).convert('L').point(lambda v: 0 if v else 2)
+            new = self._plane_image(0x13, box).convert('L').point(lambda v: 0 if v else 1)
+            region = ImageChops.add(old, new).point(_GRAY_LUT)
+            self.glass = self.glass.convert('L')
+        else:
+            region = self._plane_image(0x13, box)
+            if region.size == self.glass.size:
+                self.glass = Image.new('1', self.glass.size)
+            elif self.glass.mode != '1':
+                region = region.convert('L')
+        self.glass.paste(region, (box[0] * 8, box[1]))
+        self.stats['refresh_' + mode] += 1
+        self._busy(mode)
+        logger.debug("virtual refresh: %s %s", mode, box)
+        if self.on_refresh is not None:
+            self.on_refresh(self.glass.copy(), mode)
+
+    def _busy(self, operation):
+        ms = BUSY_MS[operation]
+        self.stats['busy_ms'] += ms
+        self._busy_until = time.monotonic() + ms / 1000.0 * self.time_scale
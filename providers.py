@@ -0,0 +1,200 @@
+"""Background data providers: keep network access off the render path.
+
+Each provider wraps one remote source (weather, electricity, dishes), refreshes it
+on its own interval from a background scheduler thread and publishes an immutable,
+display-ready snapshot. `compose_panel()` only reads snapshots, so composing is
+pure CPU and a slow endpoint can never stall a render or a button dialog.
+
+Due sources are fetched concurrently on a small thread pool, each bounded by its
+own deadline: a refresh costs the slowest source, not the sum of all timeouts.
+A source that misses its deadline keeps serving its last good snapshot (or the
+fallback); its result is still published whenever the fetch completes.
+
+Providers read their sources in blocking mode (`background=False`, see
+`data_cache`): inside the cache TTL a refresh is a memory hit, an expired entry
+is refetched on the pool and published as soon as it arrives, and a failed fetch
+(or one inside the retry backoff) returns the last good entry. Each snapshot
+records when its data was fetched; once that is older than the provider's
+`max_stale`, `is_stale(name)` turns True and the section draws a stale marker
+over the old data instead of waiting for the network.
+
+One-shot scripts (`to_image.py`, `to_display.py`) don't start the scheduler; the
+first `get_snapshot()` then refreshes all missing sources (concurrently, blocking).
+"""
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from types import MappingProxyType
+from typing import Any, Callable, Optional
+from config import API_TIMEOUT
+import data_cache
+from weather_api import get_weather_display_data, get_fallback_display_data
+from electricity_price import get_electricity_price_data
+from dishes import get_dishes
+import tracing
+
+# Refresh intervals (seconds). Sources cache their payloads (data_cache: memory +
+# file), so a refresh inside the cache TTL is only a memory hit + transform.
+WEATHER_REFRESH_INTERVAL = 300
+ELECTRICITY_REFRESH_INTERVAL = 60  # keeps the highlighted price slot current
+DISHES_REFRESH_INTERVAL = 600
+
+# Max seconds a refresh waits for each source. Slightly above the HTTP timeout:
+# urllib's timeout doesn't cover DNS resolution, the deadline does.
+WEATHER_FETCH_DEADLINE = API_TIMEOUT + 2
+ELECTRICITY_FETCH_DEADLINE = 12  # Tibber request uses a fixed 10s timeout
+DISHES_FETCH_DEADLINE = API_TIMEOUT + 2
+
+# Data age (seconds) after which a section is marked stale
+WEATHER_MAX_STALE = 3 * 3600
+ELECTRICITY_MAX_STALE = 36 * 3600  # one fetch covers today + tomorrow once published
+DISHES_MAX_STALE = 2 * 86400
+
+
+def _freeze(value):
+    """Return a read-only deep copy (dict -> mappingproxy, list -> tuple)."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class DataProvider:
+    """One source: fetch function + refresh interval + deadline + fallback snapshot + max staleness."""
+
+    def __init__(self, name: str, fetch: Callable[[], Any], interval: float, deadline: float,
+                 fallback: Callable[[], Any], max_stale: float):
+        self.name = name
+        self.interval = interval
+        self.deadline = deadline
+        self.max_stale = max_stale
+        self._fetch = fetch
+        self._fallback = fallback
+        self._snapshot = None
+        # time.time() of the last successful publish (0 = never)
+        self.updated_at = 0.0
+        # time.time() the published data was fetched at (0 = unknown / fallback)
+        self.data_at = 0.0
+        # Pending refresh on the fetch pool (at most one per source)
+        self._inflight: Optional[Future] = None
+
+    def submit(self, executor: ThreadPoolExecutor) -> Future:
+        """Start a refresh on `executor` unless one is still running; return its future."""
+        if self._inflight is None or self._inflight.done():
+            self._inflight = executor.submit(self.refresh)
+        return self._inflight
+
+    def refresh(self):
+        """Fetch + publish a new snapshot; keep the previous one on error."""
+        try:
+            with tracing.span(f"fetch.{self.name}", "fetch"):
+                value = self._fetch()
+        except Exception as e:  # noqa: BLE001 (a failing source must not kill the scheduler)
+            print(f"[PROVIDER][ERROR] '{self.name}' refresh failed: {e}")
+            return self._snapshot
+        # The source's cache knows when the payload was actually fetched
+        cache = data_cache.CACHES.get(self.name)
+        self.publish(value, cache.peek()[1] if cache is not None else None)
+        return self._snapshot
+
+    def publish(self, value, data_at: Optional[float] = None):
+        """Publish `value`, fetched at `data_at` (default: now)."""
+        self._snapshot = _freeze(value)
+        self.updated_at = time.time()
+        self.data_at = self.updated_at if data_at is None else data_at
+
+    def snapshot(self):
+        """Return the latest snapshot, or the frozen fallback if nothing was published yet."""
+        snap = self._snapshot
+        return snap if snap is not None else _freeze(self._fallback())
+
+    @property
+    def has_snapshot(self) -> bool:
+        return self._snapshot is not None
+
+    def stale(self, now: Optional[float] = None) -> bool:
+        """True when the served data is older than `max_stale` (or is the fallback)."""
+        now = time.time() if now is None else now
+        return now - self.data_at > self.max_stale
+
+    def due(self, now: float) -> bool:
+        return now - self.updated_at >= self.interval
+
+
+PROVIDERS = {
+    "weather": DataProvider("weather", lambda: get_weather_display_data(background=False), WEATHER_REFRESH_INTERVAL,
+                            WEATHER_FETCH_DEADLINE, get_fallback_display_data, WEATHER_MAX_STALE),
+    "electricity": DataProvider("electricity", lambda: get_electricity_price_data(background=False), ELECTRICITY_REFRESH_INTERVAL,
+                                ELECTRICITY_FETCH_DEADLINE, lambda: ([], [], -1, "", [], [], None),
+                                ELECTRICITY_MAX_STALE),
+    "dishes": DataProvider("dishes", lambda: get_dishes(background=False) or [], DISHES_REFRESH_INTERVAL,
+                           DISHES_FETCH_DEADLINE, lambda: [], DISHES_MAX_STALE),
+}
+
+# One worker per source so a hanging endpoint never delays the others
+_executor = ThreadPoolExecutor(max_workers=len(PROVIDERS), thread_name_prefix="fetch")
+_stop_event = threading.Event()
+_thread: Optional[threading.Thread] = None
+
+
+def get_snapshot(name: str):
+    """Return the current snapshot for provider `name` (never blocks while the scheduler runs)."""
+    provider = PROVIDERS[name]
+    if not provider.has_snapshot and _thread is None:
+        refresh([p for p in PROVIDERS.values() if not p.has_snapshot])
+    return provider.snapshot()
+
+
+def is_stale(name: str) -> bool:
+    """True when provider `name` serves data older than its `max_stale`."""
+    return PROVIDERS[name].stale()
+
+
+def refresh(providers):
+    """Refresh `providers` concurrently; wait for each at most until its deadline."""
+    started = time.monotonic()
+    pending = [(p, p.submit(_executor)) for p in providers]
+    for provider, future in pending:
+        remaining = provider.deadline - (time.monotonic() - started)
+        try:
+            future.result(timeout=max(0.0, remaining))
+        except FutureTimeout:
+            print(f"[PROVIDER] '{provider.name}' missed its {provider.deadline}s deadline; serving last good data")
+
+
+def refresh_due(now: Optional[float] = None):
+    """Refresh every provider whose interval elapsed."""
+    now = time.time() if now is None else now
+    refresh([p for p in PROVIDERS.values() if p.due(now)])
+
+
+def _run():
+    while not _stop_event.is_set():
+        refresh_due()
+        now = time.time()
+        next_due = min(p.updated_at + p.interval for p in PROVIDERS.values())
+        # Failed or late refreshes don't advance updated_at; retry no faster than every 30s
+        _stop_event.wait(next_due - now if next_due > now else 30.0)
+
+
+def start():
+    """Fetch every source once (blocking) and start the background scheduler."""
+    global _thread
+    if _thread is not None:
+        return
+    refresh_due()
+    _stop_event.clear()
+    _thread = threading.Thread(target=_run, name="providers", daemon=True)
+    _thread.start()
+    print("[PROVIDER] Scheduler started")
+
+
+def stop():
+    global _thread
+    _stop_event.set()
+    _thread = None
+    print("[PROVIDER] Scheduler stopped")
+
+
+__all__ = ["DataProvider", "PROVIDERS", "get_snapshot", "is_stale", "refresh", "refresh_due", "start", "stop"]
@@ -1,23 +1,22 @@
 """Development runner: PNG mode + MQTT updates + periodic refresh.
 
+Runs the real epd7in5_V2 driver on the virtual epdconfig backend (emulated SPI,
+GPIO and BUSY timing); every emulated panel refresh is written to `main.png`.
+`EPD_VIRTUAL_TIME_SCALE=0` skips the simulated waveform delays.
+
 Simplified threading: MQTT loop + hourly refresh thread (placeholder for future buttons).
 """
 
+import os
 import time
 import sys
 import threading
 import signal
 import paho.mqtt.client as mqtt
 
-class EPD:  # minimal mock matching methods used by DisplayController
-    width = 800
-    height = 480
-    def init(self): pass
-    def init_fast(self): pass
-    def Clear(self): pass
-    def display(self, buf): buf.save("main.png")
-    def sleep(self): pass
-    def getbuffer(self, image): return image
+os.environ.setdefault("EPD_BACKEND", "virtual")
+from lib.waveshare_epd import epdconfig
+from lib.waveshare_epd.epd7in5_V2 import EPD
 
 from config import (
     MQTT_DEVICE_TOPICS,
@@ -29,6 +28,8 @@ from config import (
 )
 from devices import update_device_by_topic
 from display_controller import DisplayController
+import providers
+import tracing
 
 
 def button_listener(controller: DisplayController):
@@ -53,6 +54,7 @@ def on_connect(client, userdata, flags, rc):
 def on_message(client, userdata, msg):
     topic = msg.topic
     payload = msg.payload.decode("utf-8").strip().lower()
+    tracing.instant("mqtt", "mqtt", topic=topic, payload=payload)
     print(f"[MQTT] {topic} => {payload}")
 
     if topic in MQTT_DEVICE_TOPICS and payload in {"on", "off"}:
@@ -63,7 +65,12 @@ def on_message(client, userdata, msg):
 def main():
     print("[INIT] Starting display runner (E-Ink mode)")
     epd = EPD()
-    controller = DisplayController(epd)
+    if hasattr(epdconfig, "set_refresh_hook"):
+        epdconfig.set_refresh_hook(lambda image, mode: image.save("main.png"))
+    # EINK_FULL_REFRESH=4gray: hourly/full renders with native grays (panels sold after 24/10/23)
+    controller = DisplayController(epd, full_refresh=os.environ.get("EINK_FULL_REFRESH", "full"))
+    # Fetch data once up front, then keep it fresh in the background
+    providers.start()
     controller.render()
 
     client = mqtt.Client(userdata=controller)
@@ -97,6 +104,7 @@ def main():
         print(f"\n[SHUTDOWN] {reason}...")
         stop_event.set()
         controller.stop()
+        providers.stop()
         try:
             client.loop_stop()
         except Exception:
@@ -1,5 +1,6 @@
 """Hardware display runner: MQTT + periodic refresh + button toggle."""
 
+import os
 import time
 import sys
 import threading
@@ -20,12 +21,15 @@ from config import (
 )
 from devices import update_device_by_topic, find_motorvarmare, set_motorvarmare
 from display_controller import DisplayController
+import providers
+import tracing
 from lib.waveshare_epd.epd7in5_V2 import EPD
 
 def button_listener(controller: DisplayController, client: mqtt.Client):
     button = Button(21, pull_up=True, bounce_time=0.05)
 
     def handle_press():
+        tracing.instant("button", "gpio")
         mv_device = find_motorvarmare()
         if mv_device is None:
             print("[BUTTON] 'Motorvärmare' device not found; ignoring press")
@@ -70,6 +74,7 @@ def on_connect(client, userdata, flags, rc):
 def on_message(client, userdata, msg):
     topic = msg.topic
     payload = msg.payload.decode("utf-8").strip().lower()
+    tracing.instant("mqtt", "mqtt", topic=topic, payload=payload)
 
     if topic in MQTT_DEVICE_TOPICS and payload in {"on", "off"}:
         updated = update_device_by_topic(topic, payload == "on")
@@ -79,7 +84,10 @@ def on_message(client, userdata, msg):
 def main():
     print("[INIT] Starting display runner (E-Ink mode)")
     epd = EPD()
-    controller = DisplayController(epd)
+    # EINK_FULL_REFRESH=4gray: hourly/full renders with native grays (panels sold after 24/10/23)
+    controller = DisplayController(epd, full_refresh=os.environ.get("EINK_FULL_REFRESH", "full"))
+    # Fetch data once up front, then keep it fresh in the background
+    providers.start()
     controller.render()
 
     client = mqtt.Client(userdata=controller)
@@ -113,6 +121,7 @@ def main():
         print(f"\n[SHUTDOWN] {reason}...")
         stop_event.set()
         controller.stop()
+        providers.stop()
         try:
             client.loop_stop()
         except Exception:
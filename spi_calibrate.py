@@ -0,0 +1,91 @@
+"""SPI clock / chunk size calibration for the epd7in5_V2 panel.
+
+Writes a full test frame into the panel's RAM (no refresh, so the glass and its
+waveform budget are untouched) at every SPI clock x writebytes2 chunk size and
+reports the effective throughput against the raw bit rate:
+
+    venv/bin/python spi_calibrate.py
+    venv/bin/python spi_calibrate.py --speeds 4 8 16 --chunks 4096 -n 5
+    venv/bin/python spi_calibrate.py --speeds 4 16 --show   # refresh a labelled pattern per clock
+
+RAM writes can't be read back, so a faster clock is only proven safe by looking
+at the glass: `--show` refreshes a checkerboard labelled with the clock after each
+setting; pick the fastest one whose pattern is clean and set it with
+`EPD_SPI_HZ=<hz>` (and `EPD_SPI_CHUNK=<bytes>`). Runs on the virtual backend
+too (`EPD_BACKEND=virtual`), where timings reflect the emulated wire speed.
+The Jetson Nano backend bit-bangs SPI through sysfs: its clock can't be set, so
+every clock row there measures the same GPIO-bound rate.
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from PIL import Image, ImageDraw
+
+from lib.waveshare_epd import epdconfig
+from lib.waveshare_epd.epd7in5_V2 import EPD
+from lib.waveshare_epd.transport import format_stats
+
+DEFAULT_SPEEDS_MHZ = (2, 4, 8, 10, 16, 20)
+DEFAULT_CHUNKS = (1024, 4096)
+
+
+def test_frame(epd, label=""):
+    """Checkerboard (8 px squares) with `label`, packed for the panel."""
+    img = Image.new("1", (epd.width, epd.height), 1)
+    draw = ImageDraw.Draw(img)
+    for y in range(0, epd.height, 8):
+        for x in range((y // 8) % 2 * 8, epd.width, 16):
+            draw.rectangle((x, y, x + 7, y + 7), fill=0)
+    if label:
+        draw.rectangle((300, 200, 500, 280), fill=1, outline=0)
+        draw.text((400, 240), label, fill=0, anchor="mm", font_size=32)
+    return epd.getbuffer(img)
+
+
+def measure(epd, frame, repeats):
+    """Median seconds to write `frame` into the new-data RAM plane."""
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        epd.send_command_data(0x13, frame)
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--speeds", type=float, nargs="+", default=DEFAULT_SPEEDS_MHZ, help="SPI clocks (MHz)")
+    parser.add_argument("--chunks", type=int, nargs="+", default=DEFAULT_CHUNKS, help="writebytes2 chunk sizes (bytes)")
+    parser.add_argument("-n", "--repeats", type=int, default=3)
+    parser.add_argument("--show", action="store_true", help="full refresh with a labelled test pattern per clock")
+    args = parser.parse_args(argv)
+
+    epd = EPD()
+    if epd.init() != 0:
+        print("[CALIBRATE][ERROR] Panel init failed")
+        return 1
+    frame = test_frame(epd)
+    size = len(frame)
+    print(f"[CALIBRATE] Frame {size} bytes, median of {args.repeats} RAM writes per setting")
+    print(f"{'clock MHz':>10}{'chunk':>8}{'ms/frame':>10}{'KiB/s':>10}{'of raw':>8}")
+    try:
+        for mhz in args.speeds:
+            for chunk in args.chunks:
+                epdconfig.configure_spi(speed_hz=int(mhz * 1e6), chunk=chunk)
+                seconds = measure(epd, frame, args.repeats)
+                rate = size / seconds
+                print(f"{mhz:>10g}{chunk:>8}{seconds * 1000:>10.1f}{rate / 1024:>10.0f}{rate * 8 / (mhz * 1e6):>8.0%}")
+            if args.show:
+                epd.display(test_frame(epd, f"{mhz:g} MHz"))
+                input(f"[CALIBRATE] Showing the {mhz:g} MHz pattern; press Enter to continue ")
+    finally:
+        epd.sleep()
+    print()
+    print(format_stats(epd.transport_stats))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Repo root importable (top-level modules, lib.waveshare_epd); drivers on the emulated panel
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("EPD_BACKEND", "virtual")
+os.environ.setdefault("EPD_VIRTUAL_TIME_SCALE", "0")
@@ -0,0 +1,389 @@
+"""packing must stay byte-identical to the per-pixel getbuffer loops it replaced.
+
+The legacy_* functions are copies of the original driver loops, one per family
+(DRIVERS / GRAY4_DRIVERS map every driver that now delegates to packing to its
+family). Each is run against the current driver on L, 1 and RGB images in
+landscape, portrait and wrong sizes; the 122 px wide panels (epd2in13*) cover
+rows that don't fill their last byte. Drivers importing RPi.GPIO are skipped
+where it isn't installed.
+"""
+import functools
+import importlib
+import logging
+import random
+
+import pytest
+from PIL import Image
+
+PALETTE_ACEP = (0, 0, 0, 255, 255, 255, 0, 255, 0, 0, 0, 255, 255, 0, 0, 255, 255, 0, 255, 128, 0)
+PALETTE_7IN3E = (0, 0, 0, 255, 255, 255, 255, 255, 0, 255, 0, 0, 0, 0, 0, 0, 0, 255, 0, 255, 0)
+PALETTE_G = (0, 0, 0, 255, 255, 255, 255, 255, 0, 255, 0, 0)
+
+
+def legacy_raw(image, width, height, invert, blank):
+    """epd7in5_V2 (invert=True, blank 0x00), epd7in5_HD (blank 0xff) and
+    epd2in13_V3 (blank 0x00) getbuffer."""
+    img = image
+    imwidth, imheight = img.size
+    if imwidth == width and imheight == height:
+        img = img.convert('1')
+    elif imwidth == height and imheight == width:
+        img = img.rotate(90, expand=True).convert('1')
+    else:
+        return [blank] * (int(width / 8) * height)
+    buf = bytearray(img.tobytes('raw'))
+    if invert:
+        for i in range(len(buf)):
+            buf[i] ^= 0xFF
+    return buf
+
+
+def legacy_mono(image, width, height):
+    """epd13in3k / epd2in7 / epd5in83bc getbuffer."""
+    buf = [0xFF] * (int(width / 8) * height)
+    image_monocolor = image.convert('1')
+    imwidth, imheight = image_monocolor.size
+    pixels = image_monocolor.load()
+    if imwidth == width and imheight == height:
+        for y in range(imheight):
+            for x in range(imwidth):
+                if pixels[x, y] == 0:
+                    buf[int((x + y * width) / 8)] &= ~(0x80 >> (x % 8))
+    elif imwidth == height and imheight == width:
+        for y in range(imheight):
+            for x in range(imwidth):
+                newx = y
+                newy = height - x - 1
+                if pixels[x, y] == 0:
+                    buf[int((newx + newy * width) / 8)] &= ~(0x80 >> (y % 8))
+    return buf
+
+
+def legacy_mono_strict(image, width, height):
+    """epd1in54b getbuffer: landscape only."""
+    buf = [0xFF] * int(width * height / 8)
+    image_monocolor = image.convert('1')
+    imwidth, imheight = image_monocolor.size
+    if imwidth != width or imheight != height:
+        raise ValueError('Image must be same dimensions as display ({0}x{1}).'.format(width, height))
+    pixels = image_monocolor.load()
+    for y in range(height):
+        for x in range(width):
+            if pixels[x, y] == 0:
+                buf[int((x + y * width) / 8)] &= ~(0x80 >> (x % 8))
+    return buf
+
+
+def legacy_linewidth(image, width, height, mirror):
+    """epd2in13 (mirror=False) / epd2in13_V2 (mirror=True) getbuffer: rows padded to whole bytes."""
+    if width % 8 == 0:
+        linewidth = int(width / 8)
+    else:
+        linewidth = int(width / 8) + 1
+    buf = [0xFF] * (linewidth * height)
+    image_monocolor = image.convert('1')
+    imwidth, imheight = image_monocolor.size
+    pixels = image_monocolor.load()
+    if imwidth == width and imheight == height:
+        for y in range(imheight):
+            for x in range(imwidth):
+                if pixels[x, y] == 0:
+                    if mirror:
+                        x = imwidth - x
+                    buf[int(x / 8) + y * linewidth] &= ~(0x80 >> (x % 8))
+    elif imwidth == height and imheight == width:
+        for y in range(imheight):
+            for x in range(imwidth):
+                newx = y
+                newy = height - x - 1
+                if pixels[x, y] == 0:
+                    if mirror:
+                        newy = imwidth - newy - 1
+                    buf[int(newx / 8) + newy * linewidth] &= ~(0x80 >> (y % 8))
+    return buf
+
+
+def legacy_7in5(image, width, height):
+    """epd7in5 getbuffer: 4 bits per pixel, white 0x3, black 0x0."""
+    img = image
+    imwidth, imheight = img.size
+    halfwidth = int(width / 2)
+    buf = [0x33] * halfwidth * height
+    if imwidth == width and imheight == height:
+        img = img.convert('1')
+    elif imwidth == height and imheight == width:
+        img = img.rotate(90, expand=True).convert('1')
+        imwidth, imheight = img.size
+    else:
+        return buf
+    pixels = img.load()
+    for y in range(imheight):
+        offset = y * halfwidth
+        for x in range(1, imwidth, 2):
+            i = offset + x // 2
+            if pixels[x - 1, y] > 191:
+                buf[i] = 0x33 if pixels[x, y] > 191 else 0x30
+            else:
+                buf[i] = 0x03 if pixels[x, y] > 191 else 0x00
+    return buf
+
+
+def legacy_5in83(image, width, height):
+    """epd5in83 getbuffer: 2 bits per pixel, black 0b00, gray (red) 0b01, white 0b11."""
+    buf = [0x00] * int(width * height / 4)
+    image_monocolor = image.convert('1')
+    imwidth, imheight = image_monocolor.size
+    pixels = image_monocolor.load()
+    if imwidth == width and imheight == height:
+        for y in range(imheight):
+            for x in range(imwidth):
+                i = int((x + y * width) / 4)
+                if pixels[x, y] < 64:
+                    buf[i] &= ~(0xC0 >> (x % 4 * 2))
+                elif pixels[x, y] < 192:
+                    buf[i] &= ~(0xC0 >> (x % 4 * 2))
+                    buf[i] |= 0x40 >> (x % 4 * 2)
+                else:
+                    buf[i] |= 0xC0 >> (x % 4 * 2)
+    elif imwidth == height and imheight == width:
+        for y in range(imheight):
+            for x in range(imwidth):
+                newx = y
+                newy = height - x - 1
+                i = int((newx + newy * width) / 4)
+                if pixels[x, y] < 64:
+                    buf[i] &= ~(0xC0 >> (y % 4 * 2))
+                elif pixels[x, y] < 192:
+                    buf[i] &= ~(0xC0 >> (y % 4 * 2))
+                    buf[i] |= 0x40 >> (y % 4 * 2)
+                else:
+                    buf[i] |= 0xC0 >> (y % 4 * 2)
+    return buf
+
+
+def _quantize(image, width, height, palette):
+    """Rotate + quantize step of the legacy palette loops (wrong sizes crashed: None)."""
+    pal_image = Image.new("P", (1, 1))
+    pal_image.putpalette(palette + (0, 0, 0) * (256 - len(palette) // 3))
+    imwidth, imheight = image.size
+    if imwidth == width and imheight == height:
+        image_temp = image
+    elif imwidth == height and imheight == width:
+        image_temp = image.rotate(90, expand=True)
+    else:
+        return None
+    return bytearray(image_temp.convert("RGB").quantize(palette=pal_image).tobytes('raw'))
+
+
+def legacy_palette4(image, width, height, palette):
+    """epd5in65f / epd7in3f / epd7in3e getbuffer: two pixels per byte."""
+    buf_7color = _quantize(image, width, height, palette)
+    if buf_7color is None:
+        return None
+    buf = [0x00] * int(width * height / 2)
+    idx = 0
+    for i in range(0, len(buf_7color), 2):
+        buf[idx] = (buf_7color[i] << 4) + buf_7color[i + 1]
+        idx += 1
+    return buf
+
+
+def legacy_palette4_exact(image, width, height):
+    """epd4in01f getbuffer: exact colour matches only, anything else black."""
+    colors = {(0, 0, 0): 0, (255, 255, 255): 1, (0, 255, 0): 2, (0, 0, 255): 3,
+              (255, 0, 0): 4, (255, 255, 0): 5, (255, 128, 0): 6}
+    buf = [0] * int(width * height / 2)
+    image_monocolor = image.convert('RGB')
+    imwidth, imheight = image_monocolor.size
+    pixels = image_monocolor.load()
+    if imwidth == width and imheight == height:
+        for y in range(imheight):
+            for x in range(imwidth):
+                add = int((x + y * width) / 2)
+                color = colors.get(pixels[x, y], 0)
+                data_t = buf[add] & ~(0xF0 >> ((x % 2) * 4))
+                buf[add] = data_t | ((color << 4) >> ((x % 2) * 4))
+    elif imwidth == height and imheight == width:
+        for y in range(imheight):
+            for x in range(imwidth):
+                newx = y
+                newy = height - x - 1
+                add = int((newx + newy * width) / 2)
+                color = colors.get(pixels[x, y], 0)
+                data_t = buf[add] & ~(0xF0 >> ((newx % 2) * 4))
+                buf[add] = data_t | ((color << 4) >> ((newx % 2) * 4))
+    return buf
+
+
+def legacy_palette2(image, width, height):
+    """getbuffer of the 4-colour "g" panels (epd3in0g etc.): four pixels per byte."""
+    buf_4color = _quantize(image, width, height, PALETTE_G)
+    if buf_4color is None:
+        return None
+    buf = [0x00] * int(width * height / 4)
+    idx = 0
+    for i in range(0, len(buf_4color), 4):
+        buf[idx] = (buf_4color[i] << 6) + (buf_4color[i + 1] << 4) + (buf_4color[i + 2] << 2) + buf_4color[i + 3]
+        idx += 1
+    return buf
+
+
+def legacy_palette2_rows(image, width, height):
+    """epd2in13g / epd2in15g getbuffer: row by row, a 2-pixel last byte on 122 px rows."""
+    buf_4color = _quantize(image, width, height, PALETTE_G)
+    if buf_4color is None:
+        return None
+    if width % 4 == 0:
+        row = width // 4
+    else:
+        row = width // 4 + 1
+    buf = [0x00] * int(row * height)
+    idx = 0
+    for j in range(0, height):
+        for i in range(0, row):
+            if i == row - 1 and width % 4:
+                buf[i + j * row] = (buf_4color[idx] << 6) + (buf_4color[idx + 1] << 4)
+                idx = idx + 2
+            else:
+                buf[i + j * row] = ((buf_4color[idx] << 6) + (buf_4color[idx + 1] << 4)
+                                    + (buf_4color[idx + 2] << 2) + buf_4color[idx + 3])
+                idx = idx + 4
+    return buf
+
+
+def legacy_4gray(image, width, height, transpose=False):
+    """getbuffer_4Gray of epd7in5_V2 and most 4-gray drivers; epd4in2 (transpose=True)
+    wrote portrait pixel (x, y) to row x instead of row height - x - 1."""
+    buf = [0xFF] * (int(width / 4) * height)
+    image_monocolor = image.convert('L')
+    imwidth, imheight = image_monocolor.size
+    pixels = image_monocolor.load()
+    i = 0
+    if imwidth == width and imheight == height:
+        for y in range(imheight):
+            for x in range(imwidth):
+                if pixels[x, y] == 0xC0:
+                    pixels[x, y] = 0x80
+                elif pixels[x, y] == 0x80:
+                    pixels[x, y] = 0x40
+                i = i + 1
+                if i % 4 == 0:
+                    buf[int((x + (y * width)) / 4)] = ((pixels[x-3, y] & 0xc0) | (pixels[x-2, y] & 0xc0) >> 2
+                                                       | (pixels[x-1, y] & 0xc0) >> 4 | (pixels[x, y] & 0xc0) >> 6)
+    elif imwidth == height and imheight == width:
+        for x in range(imwidth):
+            for y in range(imheight):
+                newx = y
+                newy = x if transpose else height - x - 1
+                if pixels[x, y] == 0xC0:
+                    pixels[x, y] = 0x80
+                elif pixels[x, y] == 0x80:
+                    pixels[x, y] = 0x40
+                i = i + 1
+                if i % 4 == 0:
+                    buf[int((newx + (newy * width)) / 4)] = ((pixels[x, y-3] & 0xc0) | (pixels[x, y-2] & 0xc0) >> 2
+                                                             | (pixels[x, y-1] & 0xc0) >> 4 | (pixels[x, y] & 0xc0) >> 6)
+    return buf
+
+
+_raw_v2 = functools.partial(legacy_raw, invert=True, blank=0x00)
+_raw = functools.partial(legacy_raw, invert=False, blank=0x00)
+_palette_g = (legacy_palette2, 0x55)
+
+# driver -> (legacy getbuffer, blank byte of a wrong size where the legacy loop crashed)
+DRIVERS = {
+    **{name: (_raw_v2, None) for name in ("epd7in5_V2", "epd7in5_V2_old", "epd7in5b_V2", "epd7in5b_V2_old")},
+    "epd7in5_HD": (functools.partial(legacy_raw, invert=False, blank=0xff), None),
+    **{name: (_raw, None) for name in ("epd2in13_V3", "epd2in13_V4", "epd2in13b_V4", "epd2in15b")},
+    **{name: (legacy_mono, None) for name in (
+        "epd13in3b", "epd13in3k", "epd1in02", "epd1in54", "epd1in54_V2", "epd1in54c", "epd2in13b_V3",
+        "epd2in13bc", "epd2in13d", "epd2in66", "epd2in66b", "epd2in7", "epd2in7_V2", "epd2in7b", "epd2in7b_V2",
+        "epd2in9", "epd2in9_V2", "epd2in9b_V3", "epd2in9b_V4", "epd2in9bc", "epd2in9d", "epd3in52", "epd3in7",
+        "epd4in2", "epd4in26", "epd4in2_V2", "epd4in2b_V2", "epd4in2b_V2_old", "epd4in2bc", "epd5in79",
+        "epd5in79b", "epd5in83_V2", "epd5in83b_V2", "epd5in83bc", "epd7in5b_HD", "epd7in5bc")},
+    "epd1in54b": (legacy_mono_strict, None),
+    "epd1in54b_V2": (legacy_mono_strict, None),
+    "epd2in13": (functools.partial(legacy_linewidth, mirror=False), None),
+    "epd2in13_V2": (functools.partial(legacy_linewidth, mirror=True), None),
+    "epd7in5": (legacy_7in5, None),
+    "epd5in83": (legacy_5in83, None),
+    "epd4in01f": (legacy_palette4_exact, None),
+    "epd5in65f": (functools.partial(legacy_palette4, palette=PALETTE_ACEP), 0x11),
+    "epd7in3f": (functools.partial(legacy_palette4, palette=PALETTE_ACEP), 0x11),
+    "epd7in3e": (functools.partial(legacy_palette4, palette=PALETTE_7IN3E), 0x11),
+    **{name: _palette_g for name in (
+        "epd1in64g", "epd2in36g", "epd2in66g", "epd3in0g", "epd4in37g", "epd5in79g", "epd7in3g")},
+    "epd2in13g": (legacy_palette2_rows, 0x55),
+    "epd2in15g": (legacy_palette2_rows, 0x55),
+}
+GRAY4_DRIVERS = {
+    **{name: legacy_4gray for name in (
+        "epd13in3k", "epd2in7", "epd2in7_V2", "epd2in9_V2", "epd3in7", "epd4in26", "epd5in79", "epd7in5_V2")},
+    "epd4in2": functools.partial(legacy_4gray, transpose=True),
+    "epd4in2_V2": functools.partial(legacy_4gray, transpose=True),
+}
+MODES = ("L", "1", "RGB")
+SHAPES = ("landscape", "portrait", "wrong")
+# Pure colours for the palette drivers' RGB images (exact matches and dither targets)
+COLOURS = ((255, 0, 0), (255, 255, 0), (0, 255, 0), (0, 0, 255), (255, 128, 0), (10, 200, 90))
+
+
+def load(driver):
+    try:
+        module = importlib.import_module("lib.waveshare_epd." + driver)
+    except ImportError as e:
+        pytest.skip(f"{driver}: {e}")
+    return module.EPD()
+
+
+def make_image(mode, size, seed=0):
+    """Noise plus bands of the exact 4-gray levels (0x00, 0x80, 0xC0, 0xFF) and,
+    in RGB, of pure colours."""
+    rnd = random.Random(seed)
+    width, height = size
+    img = Image.frombytes("L", size, bytes(rnd.getrandbits(8) for _ in range(width * height)))
+    for i, level in enumerate((0x00, 0x80, 0xC0, 0xFF)):
+        img.paste(level, (0, i * height // 8, width, (i + 1) * height // 8))
+    img = img.convert(mode)
+    if mode == "RGB":
+        for i, colour in enumerate(COLOURS):
+            img.paste(colour, (i * width // len(COLOURS), height // 2, (i + 1) * width // len(COLOURS), height * 5 // 8))
+    return img
+
+
+def shape_size(epd, shape):
+    return {"landscape": (epd.width, epd.height),
+            "portrait": (epd.height, epd.width),
+            "wrong": (epd.width - 8, epd.height)}[shape]
+
+
+@pytest.mark.parametrize("shape", SHAPES)
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("driver", sorted(DRIVERS))
+def test_getbuffer_matches_legacy(driver, mode, shape, caplog):
+    legacy, crash_blank = DRIVERS[driver]
+    epd = load(driver)
+    image = make_image(mode, shape_size(epd, shape))
+    try:
+        expected = legacy(image, epd.width, epd.height)
+    except ValueError:
+        with pytest.raises(ValueError):
+            epd.getbuffer(image)
+        return
+    with caplog.at_level(logging.WARNING):
+        buf = epd.getbuffer(image)
+    if expected is None:
+        # The legacy loop crashed on this size; now a blank frame and a warning
+        assert bytes(buf) == bytes([crash_blank]) * len(epd.getbuffer(make_image(mode, shape_size(epd, "landscape"))))
+        assert "Wrong image dimensions" in caplog.text
+    else:
+        assert bytes(buf) == bytes(expected)
+
+
+@pytest.mark.parametrize("shape", SHAPES)
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("driver", sorted(GRAY4_DRIVERS))
+def test_getbuffer_4gray_matches_legacy(driver, mode, shape):
+    epd = load(driver)
+    image = make_image(mode, shape_size(epd, shape))
+    assert bytes(epd.getbuffer_4Gray(image)) == bytes(GRAY4_DRIVERS[driver](image, epd.width, epd.height))
@@ -0,0 +1,69 @@
+"""Memoized text measurement shared by all sections and the dialog.
+
+`text_bbox(text, font)` equals `draw.textbbox((0, 0), text, font=font)` on a
+grayscale image but doesn't need an ImageDraw and is cached per (font, text).
+`wrap_text` measures every word once (advance width + ink bbox) so wrapping is
+linear in the number of words instead of re-measuring each growing line prefix.
+"""
+from functools import lru_cache
+from typing import List
+
+
+@lru_cache(maxsize=1024)
+def text_bbox(text: str, font):
+    """Return (left, top, right, bottom) of `text` drawn at (0, 0)."""
+    return font.getbbox(text, "L")
+
+
+def text_width(text: str, font) -> float:
+    bbox = text_bbox(text, font)
+    return bbox[2] - bbox[0]
+
+
+@lru_cache(maxsize=1024)
+def text_length(text: str, font) -> float:
+    """Return the advance width of `text` (additive across concatenated runs)."""
+    return font.getlength(text, "L")
+
+
+def wrap_text(text: str, font, max_width: float, max_lines: int = 6) -> List[str]:
+    """Greedy word wrap; at most `max_lines` lines of at most `max_width` pixels of ink.
+
+    Lines advance by the words' advance widths, but a line is measured by its ink
+    extent: from the first word's bbox left to the last word's bbox right, so
+    glyphs overhanging their advance (italics, trailing overhang) can't push a
+    line past `max_width`.
+    """
+    space = text_length(" ", font)
+    lines: List[str] = []
+    current: List[str] = []
+    current_width = 0.0  # advance width of the current line
+    line_left = 0  # ink left edge of the current line (its first word's bbox left)
+    for w in text.split():
+        word_width = text_length(w, font)
+        word_left, _, word_right, _ = text_bbox(w, font)
+        if current:
+            start = current_width + space
+            ink_width = start + word_right - line_left
+        else:
+            start = 0.0
+            ink_width = word_right - word_left
+        if ink_width <= max_width:
+            if not current:
+                line_left = word_left
+            current.append(w)
+            current_width = start + word_width
+        else:
+            if current:
+                lines.append(" ".join(current))
+            current = [w]
+            current_width = word_width
+            line_left = word_left
+        if len(lines) >= max_lines - 1:  # reserve space for last line
+            break
+    if current and len(lines) < max_lines:
+        lines.append(" ".join(current))
+    return lines
+
+
+__all__ = ["text_bbox", "text_width", "text_length", "wrap_text"]
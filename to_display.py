@@ -1,5 +1,6 @@
 from lib.waveshare_epd.epd7in5_V2 import EPD
 from compose import compose_panel
+from dither import pack_ordered
 
 def generate_display():
     """Render and push image buffer to physical E‑Ink display (layout via compose_panel)."""
@@ -8,7 +9,7 @@ def generate_display():
     epd.Clear()
 
     image = compose_panel()
-    epd.display(epd.getbuffer(image))
+    epd.display(pack_ordered(image, epd.width, epd.height))
     epd.sleep()
 
 if __name__ == "__main__":
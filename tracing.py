@@ -0,0 +1,128 @@
+"""Opt-in update-cycle tracer writing Chrome / Perfetto trace JSON.
+
+Enable by pointing `EINK_TRACE` at an output file:
+
+    EINK_TRACE=/tmp/panel-trace.json venv/bin/python run_display.py
+
+and open the file in https://ui.perfetto.dev (or chrome://tracing). Spans cover
+the whole button-to-panel path: MQTT receive, provider fetches,
+compose sections, packing, SPI transfers (`send_data2`, `send_command_data`)
+and `ReadBusy` waits, one track per thread. The file is rewritten after every panel refresh and at shutdown.
+
+Disabled (the default) every call is a cheap no-op. Events are kept in a bounded
+ring buffer, so long runs keep only the most recent cycles.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+MAX_EVENTS = 20000  # ~2 MB of JSON; older events are dropped first
+
+# Methods wrapped by `instrument_epd` (missing ones are skipped, e.g. on mocks)
+EPD_TRACED_METHODS = (
+    "init", "init_fast", "init_part", "init_4Gray", "Clear", "display", "display_Partial",
+    "display_4Gray", "getbuffer", "sleep", "send_data2", "send_command_data", "ReadBusy",
+)
+_EPD_SPI_METHODS = ("send_data2", "send_command_data")
+
+_path = os.environ.get("EINK_TRACE") or None
+_events = deque(maxlen=MAX_EVENTS)
+_thread_names = {}
+_lock = threading.Lock()
+_pid = os.getpid()
+
+
+def enabled() -> bool:
+    return _path is not None
+
+
+def enable(path: str):
+    """Start recording; `flush()` writes to `path`."""
+    global _path
+    _path = path
+
+
+def _now_us() -> float:
+    return time.perf_counter() * 1e6
+
+
+def _record(event: dict):
+    thread = threading.current_thread()
+    event["pid"] = _pid
+    event["tid"] = thread.ident
+    with _lock:
+        _thread_names.setdefault(thread.ident, thread.name)
+        _events.append(event)
+
+
+def complete(name: str, cat: str, start: float, end: float, **args):
+    """Record a span from `start` to `end` (`time.perf_counter()` seconds)."""
+    if _path is None:
+        return
+    _record({"name": name, "cat": cat, "ph": "X", "ts": start * 1e6,
+             "dur": (end - start) * 1e6, "args": args})
+
+
+def instant(name: str, cat: str, **args):
+    """Record a point-in-time event (e.g. an MQTT message arriving)."""
+    if _path is None:
+        return
+    _record({"name": name, "cat": cat, "ph": "i", "s": "t", "ts": _now_us(), "args": args})
+
+
+@contextmanager
+def span(name: str, cat: str, **args):
+    """Time the enclosed block as one span (no-op when tracing is disabled)."""
+    if _path is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        complete(name, cat, start, time.perf_counter(), **args)
+
+
+def _wrap(func, name: str, cat: str):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with span(name, cat):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def instrument_epd(epd):
+    """Wrap the driver methods of `epd` (instance only) so each call becomes a span."""
+    if _path is None:
+        return epd
+    for name in EPD_TRACED_METHODS:
+        method = getattr(epd, name, None)
+        if method is not None:
+            cat = "spi" if name in _EPD_SPI_METHODS else "busy" if name == "ReadBusy" else "epd"
+            setattr(epd, name, _wrap(method, f"epd.{name}", cat))
+    return epd
+
+
+def flush():
+    """Write all buffered events to the trace file (atomic replace)."""
+    if _path is None:
+        return
+    with _lock:
+        events = list(_events)
+        names = dict(_thread_names)
+    meta = [{"name": "thread_name", "ph": "M", "pid": _pid, "tid": tid, "args": {"name": tname}}
+            for tid, tname in names.items()]
+    tmp = f"{_path}.tmp"
+    try:
+        with open(tmp, "w") as f:
+            json.dump({"traceEvents": meta + events, "displayTimeUnit": "ms"}, f)
+        os.replace(tmp, _path)
+    except OSError as e:
+        print(f"[TRACE][ERROR] Writing {_path} failed: {e}")
+
+
+__all__ = ["enabled", "enable", "span", "complete", "instant", "instrument_epd", "flush", "MAX_EVENTS"]
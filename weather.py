@@ -9,37 +9,51 @@ from gui_constant import (
   headline_text_size,
   text_size,
 )
-from weather_api import get_weather_display_data
+from glyph_cache import draw_text
+from text_metrics import text_width
 
 
-def draw_weather(draw, pos):
-  """Render current conditions + 5‑day forecast anchored at `pos` (x, y)."""
-  data = get_weather_display_data()
+# Detail row glyphs: wind, sun times, rain, UV
+DETAIL_GLYPHS = ("\uefd8", "\ue1c6", "\ue798", "\ue81a")
+
+
+def _detail_pos(pos):
+  return (pos[0] + big_icon_size + headline_text_size + 64, pos[1] + 8)
+
+
+def draw_weather_static(draw, pos):
+  """Draw the data-independent detail row glyphs (static layer)."""
+  detail_pos = _detail_pos(pos)
+  for i, glyph in enumerate(DETAIL_GLYPHS):
+    draw_text(draw, (detail_pos[0], detail_pos[1] + i * icon_size), glyph, font=icon_font, fill=colors["black"])
+
+
+def draw_weather(draw, pos, data):
+  """Render current conditions + 5‑day forecast anchored at `pos` (x, y).
+
+  `data` is the display dict from `get_weather_display_data()` (provider snapshot).
+  """
   current = data["current"]
   forecast = data["forecast"]
 
   # Primary current icon + temperature
-  draw.text((pos[0], pos[1] + 16), current["icon"], font=big_icon_font, fill=colors["black"])
-  draw.text(
+  draw_text(draw, (pos[0], pos[1] + 16), current["icon"], font=big_icon_font, fill=colors["black"])
+  draw_text(
+    draw,
     (pos[0] + big_icon_size + 16, pos[1] + 16 + (big_icon_size - headline_text_size) / 2),
     current["temp"],
     font=headline_text_font,
     fill=colors["black"],
   )
 
-  detail_pos = (pos[0] + big_icon_size + headline_text_size + 64, pos[1] + 8)
+  detail_pos = _detail_pos(pos)
 
-  # Detail rows: wind, sun times, rain, UV
-  rows = [
-    ("\uefd8", current["wind_speed"]),
-    ("\ue1c6", current["sun_times"]),
-    ("\ue798", current["rain"]),
-    ("\ue81a", current["uv_info"]),
-  ]
-  for i, (glyph, text) in enumerate(rows):
+  # Detail rows: wind, sun times, rain, UV (glyphs are in the static layer)
+  rows = [current["wind_speed"], current["sun_times"], current["rain"], current["uv_info"]]
+  for i, text in enumerate(rows):
     y = detail_pos[1] + i * icon_size
-    draw.text((detail_pos[0], y), glyph, font=icon_font, fill=colors["black"])
-    draw.text(
+    draw_text(
+      draw,
       (detail_pos[0] + icon_size + 8, y + (icon_size - text_size) / 2),
       text,
       font=text_font,
@@ -52,10 +66,11 @@ def draw_weather(draw, pos):
     temp_width = get_text_width(draw, item["temp"], text_font)
     day_width = get_text_width(draw, item["day"], text_font)
     day_x = current_x + (temp_width - day_width) / 2
-    draw.text((day_x, forecast_pos_y), item["day"], font=text_font, fill=colors["black"])
+    draw_text(draw, (day_x, forecast_pos_y), item["day"], font=text_font, fill=colors["black"])
     icon_x = current_x + (temp_width - icon_size) / 2
-    draw.text((icon_x, forecast_pos_y + text_size + 8), item["icon"], font=icon_font, fill=colors["black"])
-    draw.text(
+    draw_text(draw, (icon_x, forecast_pos_y + text_size + 8), item["icon"], font=icon_font, fill=colors["black"])
+    draw_text(
+      draw,
       (current_x, forecast_pos_y + text_size + 8 + icon_size + 8),
       item["temp"],
       font=text_font,
@@ -65,5 +80,4 @@ def draw_weather(draw, pos):
 
 
 def get_text_width(draw, text, font):
-  bbox = draw.textbbox((0, 0), text, font=font)
-  return bbox[2] - bbox[0]
+  return text_width(text, font)
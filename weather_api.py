@@ -1,9 +1,9 @@
 import os
-import json
 import time
-import urllib.request
 import urllib.error
+import http_client
 from datetime import datetime
+import data_cache
 from config import (
     WEATHER_API_KEY,
     WEATHER_LAT,
@@ -14,8 +14,13 @@ from config import (
     CACHE_DURATION
 )
 
-# Cache path (1h TTL controlled via CACHE_DURATION)
+# One Call blocks the panel doesn't use (current, hourly and daily are kept)
+WEATHER_EXCLUDE = "minutely,alerts"
+
+# Cache path (1h TTL controlled via CACHE_DURATION). The cache holds the digest
+# (`digest_weather_data()`), not the raw response; bump the version when its shape changes.
 CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "weather_cache.json")
+_cache = data_cache.DataCache("weather", data_cache.ttl(CACHE_DURATION), CACHE_FILE, version=2)
 
 # Weather icon mapping (OpenWeatherMap code -> font glyph). Fallback defaults to cloudy.
 WEATHER_ICONS = {
@@ -57,54 +62,24 @@ DAYS_OF_WEEK_SV = {
     6: "Sön"
 }
 
-def get_cached_data():
-    """Return cached weather data if present and valid; else None."""
-    try:
-        if os.path.exists(CACHE_FILE):
-            with open(CACHE_FILE, 'r') as f:
-                cache_data = json.load(f)
-
-            # Check if cache is still valid
-            if time.time() - cache_data.get('timestamp', 0) < CACHE_DURATION:
-                return cache_data.get('data')
-    except Exception as e:
-        print(f"Error reading cache: {e}")
-    return None
-
-def save_to_cache(data):
-    """Persist payload + timestamp to cache file (best-effort)."""
-    try:
-        cache_data = {
-            'timestamp': time.time(),
-            'data': data
-        }
-        with open(CACHE_FILE, 'w') as f:
-            json.dump(cache_data, f)
-    except Exception as e:
-        print(f"Error writing cache: {e}")
+def fetch_weather_data(background=True):
+    """Return the weather digest (cache first, then API). Fallback on error.
 
-def fetch_weather_data():
-    """Fetch weather data (cache first, then API). Fallback on error."""
-
-    # Check cache first
-    cached_data = get_cached_data()
-    if cached_data:
-        return cached_data
+    `background`: see `DataCache.get` (providers pass False and fetch blocking).
+    """
+    data = _cache.get(_request_weather_data, background)
+    return data if data is not None else get_fallback_data()
 
-    # If no valid cache, make API request
+def _request_weather_data():
+    """One Call API request; returns the digest of the payload or None on error."""
     try:
         url = (f"https://api.openweathermap.org/data/3.0/onecall"
                f"?lat={WEATHER_LAT}&lon={WEATHER_LON}"
                f"&units={WEATHER_UNITS}&lang={WEATHER_LANG}"
+               f"&exclude={WEATHER_EXCLUDE}"
                f"&appid={WEATHER_API_KEY}")
 
-        request = urllib.request.Request(url)
-        with urllib.request.urlopen(request, timeout=API_TIMEOUT) as response:
-            data = json.loads(response.read().decode('utf-8'))
-
-            # Save to cache
-            save_to_cache(data)
-            return data
+        return digest_weather_data(http_client.get(url, timeout=API_TIMEOUT, conditional=True).json())
 
     except urllib.error.HTTPError as e:
         print(f"HTTP Error: {e.code} - {e.reason}")
@@ -114,13 +89,11 @@ def fetch_weather_data():
         print(f"URL Error: {e.reason}")
     except Exception as e:
         print(f"Error fetching weather data: {e}")
-
-    # Return fallback data in case of an error
-    return get_fallback_data()
+    return None
 
 def get_fallback_data():
-    """Deterministic fallback data structure used if API fails."""
-    return {
+    """Deterministic fallback digest used if API fails."""
+    return digest_weather_data({
         "current": {
             "temp": 15.0,
             "weather": [{"icon": "01d"}],
@@ -137,157 +110,192 @@ def get_fallback_data():
                 "weather": [{"icon": "01d"}]
             } for i in range(5)
         ]
-    }
-
-def get_uv_info(weather_data):
-    """Return UV info string: current or "cur (max, start - end)" if >=3 hours exist."""
-    current_uv = weather_data.get('current', {}).get('uvi', 0)
-    current_time = datetime.fromtimestamp(weather_data.get('current', {}).get('dt', 0))
-    current_date = current_time.date()
-
-    # Find max UV for the current day and hours where UV >= 3
-    max_uv = current_uv
-    uv_hours = []
+    })
 
-    hourly = weather_data.get('hourly', [])
+def _rain_amount(entry):
+    """Return an entry's rain['1h'] as float (0 when missing or not numeric)."""
+    rain_amount = entry.get('rain', {}).get('1h', 0) if entry.get('rain') else 0
+    try:
+        # Ensure numeric (API sometimes returns dict values already numeric)
+        return float(rain_amount)
+    except (TypeError, ValueError):
+        return 0.0
+
+def get_hourly_breakpoints(current, hourly):
+    """Return one breakpoint row per hourly entry: [dt, uvi, rain_left, uv_max, uv_start, uv_end].
+
+    Per local day of the row: `rain_left` is the predicted rain from this hour to
+    the end of the day; `uv_max` is the day's max UV (the current index counts for
+    the fetch day) and `uv_start`/`uv_end` the first/last hour with UV >= 3 (None
+    if UV never reaches 3).
+    """
+    current_date = datetime.fromtimestamp(current['dt']).date()
+    days = {}  # date -> [(dt, hour of day, uvi, rain)], chronological
     for hour in hourly:
-        hour_time = datetime.fromtimestamp(hour.get('dt', 0))
-        hour_date = hour_time.date()
-
-        # Skip if not current day
-        if hour_date != current_date:
-            continue
-
-        uv = hour.get('uvi', 0)
-        if uv > max_uv:
-            max_uv = uv
-
-        # Track hours and their UV index for the current day
-        uv_hours.append((hour_time.hour, uv))
+        dt = hour.get('dt', 0)
+        hour_time = datetime.fromtimestamp(dt)
+        days.setdefault(hour_time.date(), []).append((dt, hour_time.hour, hour.get('uvi', 0), _rain_amount(hour)))
+
+    rows = []
+    for day, hours in days.items():
+        uv_max = max([uv for _, _, uv, _ in hours] + ([current.get('uvi', 0)] if day == current_date else []))
+        high_uv_hours = [hour for _, hour, uv, _ in hours if uv >= 3]
+        uv_start = min(high_uv_hours) if high_uv_hours else None
+        uv_end = max(high_uv_hours) if high_uv_hours else None
+        amounts = [rain for _, _, _, rain in hours]
+        for i, (dt, _, uv, _) in enumerate(hours):
+            rows.append([dt, uv, sum(amounts[i:], 0.0), uv_max, uv_start, uv_end])
+    return rows
+
+def _fetch_time_values(current, rows):
+    """Return (uv_now, uv_max, uv_start, uv_end, rain) at the fetch time."""
+    current_uv = current.get('uvi', 0)
+    if not rows:
+        return current_uv, current_uv, None, None, _rain_amount(current)
+    current_date = datetime.fromtimestamp(current['dt']).date()
+    today = [row for row in rows if datetime.fromtimestamp(row[0]).date() == current_date]
+    if not today:
+        return current_uv, current_uv, None, None, 0.0
+    # Rain counts the remaining hours only (a row's own hour onwards)
+    remaining = [row for row in today if row[0] >= current['dt']]
+    _, _, _, uv_max, uv_start, uv_end = today[0]
+    return current_uv, uv_max, uv_start, uv_end, remaining[0][2] if remaining else 0.0
+
+def digest_weather_data(weather_data):
+    """Reduce a raw One Call payload to the compact structure the weather section needs.
+
+    This is what gets cached, so the hourly walk runs once per fetch:
+        {"current": {dt, temp, icon, wind_speed, sunrise, sunset,
+                     "at_fetch": [uv_now, uv_max, uv_start, uv_end, rain]},
+         "hourly": get_hourly_breakpoints(),
+         "daily": [[dt, temp_min, temp_max, icon], ...]}  (5 days from tomorrow)
+    Icons are OpenWeatherMap codes.
+    """
+    current = dict(weather_data.get('current', {}))
+    current.setdefault('dt', int(time.time()))
+    rows = get_hourly_breakpoints(current, weather_data.get('hourly', []))
+    return {
+        "current": {
+            "dt": current['dt'],
+            "temp": current.get('temp', 0),
+            "icon": current.get('weather', [{}])[0].get('icon', '01d'),
+            "wind_speed": current.get('wind_speed', 0),
+            "sunrise": current.get('sunrise', 0),
+            "sunset": current.get('sunset', 0),
+            "at_fetch": list(_fetch_time_values(current, rows)),
+        },
+        "hourly": rows,
+        "daily": [
+            [day.get('dt', 0), day.get('temp', {}).get('min', 0), day.get('temp', {}).get('max', 0),
+             day.get('weather', [{}])[0].get('icon', '01d')]
+            for day in weather_data.get('daily', [])[1:6]
+        ],
+    }
 
-    # Find continuous range of hours where UV >= 3
-    high_uv_range = []
-    for hour, uv in uv_hours:
-        if uv >= 3:
-            high_uv_range.append(hour)
+def get_hour_values(digest, now):
+    """Return (uv_now, uv_max, uv_start, uv_end, rain) for the clock hour containing `now`.
 
-    # Format UV information
-    if not high_uv_range:
+    Inside the fetch hour these are the fetch-time values; later hours are an
+    index lookup into the hourly breakpoints. Past the end of the hourly data the
+    fetch-time values are kept.
+    """
+    current = digest["current"]
+    rows = digest["hourly"]
+    hour_start = int(now // 3600 * 3600)
+    if rows and hour_start > current["dt"]:
+        i = (hour_start - rows[0][0]) // 3600
+        if not (0 <= i < len(rows) and rows[i][0] == hour_start):
+            # Irregular spacing: fall back to a scan
+            i = next((j for j, row in enumerate(rows) if row[0] == hour_start), None)
+        if i is not None:
+            _, uv_now, rain, uv_max, uv_start, uv_end = rows[i]
+            return uv_now, uv_max, uv_start, uv_end, rain
+    return tuple(current["at_fetch"])
+
+def format_uv_info(uv_now, uv_max, uv_start, uv_end):
+    """Return UV info string: current or "cur (max, start - end)" if UV reaches 3 that day."""
+    if uv_start is None:
         # If UV never reaches 3, just show the current index
-        uv_text = f"{current_uv:.0f}"
-    else:
-        # Format as "current UV (max UV, start hour - end hour)"
-        min_hour = min(high_uv_range)
-        max_hour = max(high_uv_range)
-        uv_text = f"{current_uv:.0f} ({max_uv:.0f}, {min_hour} - {max_hour})"
+        return f"{uv_now:.0f}"
+    return f"{uv_now:.0f} ({uv_max:.0f}, {uv_start} - {uv_end})"
 
-    return uv_text
+def get_weather_display_data(background=True):
+    """Fetch (cache first) and transform weather data into display dict used by renderer."""
+    return build_weather_display_data(fetch_weather_data(background))
 
-def get_rain_total(weather_data):
-    """Return total predicted rain (mm) for the remaining hours of the current day.
+# ((fetch dt, clock hour), display dict) of the last build_weather_display_data() call
+_view = (None, None)
 
-    Logic mirrors get_uv_info's same-day filtering:
-    - Uses hourly array if present.
-    - Sums each hour's rain['1h'] where the hour is on the current date and >= current time.
-    - Falls back to current hour's rain if hourly data missing.
-    """
-    current = weather_data.get('current', {})
-    current_time = datetime.fromtimestamp(current.get('dt', time.time()))
-    current_date = current_time.date()
-
-    hourly = weather_data.get('hourly', [])
-    if not hourly:
-        return current.get('rain', {}).get('1h', 0) if current.get('rain') else 0
-
-    total = 0.0
-    for hour in hourly:
-        hour_dt = datetime.fromtimestamp(hour.get('dt', 0))
-        if hour_dt.date() != current_date:
-            # stop when day changes (hourly is chronological); optional optimization
-            continue
-        if hour_dt < current_time:
-            # skip past hours (in case API returns earlier hours including history)
-            continue
-        rain_amount = hour.get('rain', {}).get('1h', 0) if hour.get('rain') else 0
-        try:
-            # Ensure numeric (API sometimes returns dict values already numeric)
-            total += float(rain_amount)
-        except (TypeError, ValueError):
-            pass
-    return total
+def build_weather_display_data(digest, now=None):
+    """Transform a weather digest (`digest_weather_data()`) into display dict used by renderer.
 
-def get_weather_display_data():
-    """Transform raw weather data into display dict used by renderer."""
+    UV and rain follow the clock hour of `now` (default: current time). The result
+    only changes with the fetch or the hour, so it is memoized on both.
+    """
+    global _view
+    now = time.time() if now is None else now
     try:
-        weather_data = fetch_weather_data()
-
-        # Current weather data
-        current = weather_data.get('current', {})
-        temp = current.get('temp', 0)
-        weather_icon = current.get('weather', [{}])[0].get('icon', '01d')
-        wind_speed = current.get('wind_speed', 0)
+        current = digest["current"]
+        key = (current["dt"], int(now // 3600))
+        if _view[0] == key:
+            return _view[1]
 
         # Sunrise/sunset times
-        sunrise_time = datetime.fromtimestamp(current.get('sunrise', 0))
-        sunset_time = datetime.fromtimestamp(current.get('sunset', 0))
+        sunrise_time = datetime.fromtimestamp(current['sunrise'])
+        sunset_time = datetime.fromtimestamp(current['sunset'])
         sun_times = f"{sunrise_time.strftime('%H:%M')} / {sunset_time.strftime('%H:%M')}"
 
-        # Precipitation data (sum remaining hours today)
-        rain_total = get_rain_total(weather_data)
-
-        # UV index information
-        uv_info = get_uv_info(weather_data)
+        uv_now, uv_max, uv_start, uv_end, rain_total = get_hour_values(digest, now)
 
         # Daily forecast data
         forecast = []
-        for i, day in enumerate(weather_data.get('daily', [])[1:6]):  # Get 5-day forecast
-            day_dt = datetime.fromtimestamp(day.get('dt', 0))
-            day_name = DAYS_OF_WEEK_SV.get(day_dt.weekday(), "")
+        for day_ts, temp_min, temp_max, day_icon_code in digest["daily"]:
+            day_name = DAYS_OF_WEEK_SV.get(datetime.fromtimestamp(day_ts).weekday(), "")
 
-            day_icon_code = day.get('weather', [{}])[0].get('icon', '01d')
             day_icon = WEATHER_ICONS.get(day_icon_code)
             if not day_icon:
                 print(f"Could not found icon for code: {day_icon_code}")
                 day_icon = "\uf04c"  # Fallback to ? if mapping fails
 
-            temp_min = day.get('temp', {}).get('min', 0)
-            temp_max = day.get('temp', {}).get('max', 0)
-            temp_text = f"{temp_min:.0f}°/{temp_max:.0f}°"
-
             forecast.append({
                 "day": day_name,
                 "icon": day_icon,
-                "temp": temp_text
+                "temp": f"{temp_min:.0f}°/{temp_max:.0f}°"
             })
 
-        return {
+        display = {
             "current": {
-                "temp": f"{temp:.0f}°",
-                "icon": WEATHER_ICONS.get(weather_icon, "\uf04c"),
-                "wind_speed": f"{wind_speed:.0f} m/s",
+                "temp": f"{current['temp']:.0f}°",
+                "icon": WEATHER_ICONS.get(current['icon'], "\uf04c"),
+                "wind_speed": f"{current['wind_speed']:.0f} m/s",
                 "sun_times": sun_times,
                 "rain": f"{rain_total:.1f} mm",
-                "uv_info": uv_info
+                "uv_info": format_uv_info(uv_now, uv_max, uv_start, uv_end)
             },
             "forecast": forecast
         }
+        _view = (key, display)
+        return display
     except Exception as e:
         print(f"Error processing weather data: {e}")
-        # Return fallback display data
-        return {
-            "current": {
-                "temp": "99°",
-                "icon": "\uf157",
-                "wind_speed": "99 m/s",
-                "sun_times": "06:18 / 21:05",
-                "rain": "0 mm",
-                "uv_info": "99 (99, 10 - 14)"
-            },
-            "forecast": [
-                {"day": "Mån", "icon": "\uf157", "temp": "16°/24°"},
-                {"day": "Tis", "icon": "\ue81a", "temp": "14°/20°"},
-                {"day": "Ons", "icon": "\ue798", "temp": "10°/17°"},
-                {"day": "Tor", "icon": "\ue818", "temp": "12°/19°"},
-                {"day": "Fre", "icon": "\ue80f", "temp": "15°/22°"}
-            ]
-        }
+        return get_fallback_display_data()
+
+def get_fallback_display_data():
+    """Deterministic display dict used when weather data cannot be processed."""
+    return {
+        "current": {
+            "temp": "99°",
+            "icon": "\uf157",
+            "wind_speed": "99 m/s",
+            "sun_times": "06:18 / 21:05",
+            "rain": "0 mm",
+            "uv_info": "99 (99, 10 - 14)"
+        },
+        "forecast": [
+            {"day": "Mån", "icon": "\uf157", "temp": "16°/24°"},
+            {"day": "Tis", "icon": "\ue81a", "temp": "14°/20°"},
+            {"day": "Ons", "icon": "\ue798", "temp": "10°/17°"},
+            {"day": "Tor", "icon": "\ue818", "temp": "12°/19°"},
+            {"day": "Fre", "icon": "\ue80f", "temp": "15°/22°"}
+        ]
+    }